@@ -0,0 +1,27 @@
+"""add shuffle seed to quiz attempts and question pools to quizzes
+
+Revision ID: 02
+Revises: 01
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '02'
+down_revision = '01'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.add_column(sa.Column('questions_per_attempt', sa.Integer(), nullable=True))
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.add_column(sa.Column('shuffle_seed', sa.Integer(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.drop_column('shuffle_seed')
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.drop_column('questions_per_attempt')
@@ -0,0 +1,63 @@
+"""add quiz attempt archive tables
+
+Revision ID: 03
+Revises: 02
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '03'
+down_revision = '02'
+branch_labels = None
+depends_on = None
+
+ARCHIVE_PARTITIONS = 8
+
+def upgrade():
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+
+    op.create_table(
+        'quiz_attempt_archives',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('quiz_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('start_time', sa.DateTime(), nullable=True),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('status', sa.String(20), nullable=True),
+        sa.Column('correct_answers', sa.Integer(), nullable=False),
+        sa.Column('total_questions', sa.Integer(), nullable=False),
+        sa.Column('responses', sa.LargeBinary(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'quiz_id'),
+        postgresql_partition_by='HASH (quiz_id)',
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        for remainder in range(ARCHIVE_PARTITIONS):
+            op.execute(
+                f"CREATE TABLE quiz_attempt_archives_p{remainder} PARTITION OF quiz_attempt_archives "
+                f"FOR VALUES WITH (MODULUS {ARCHIVE_PARTITIONS}, REMAINDER {remainder})"
+            )
+    op.create_index('ix_quiz_attempt_archives_quiz_id', 'quiz_attempt_archives', ['quiz_id'])
+    op.create_index('ix_quiz_attempt_archives_user_id', 'quiz_attempt_archives', ['user_id'])
+
+    op.create_table(
+        'quiz_archive_stats',
+        sa.Column('quiz_id', sa.Integer(), sa.ForeignKey('quizzes.id'), primary_key=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('mean_score', sa.Float(), nullable=True),
+        sa.Column('analytics', sa.Text(), nullable=False),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table('quiz_archive_stats')
+    op.drop_index('ix_quiz_attempt_archives_user_id', table_name='quiz_attempt_archives')
+    op.drop_index('ix_quiz_attempt_archives_quiz_id', table_name='quiz_attempt_archives')
+    op.drop_table('quiz_attempt_archives')
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.drop_column('archived_at')
@@ -0,0 +1,25 @@
+"""add packed response columns to quiz attempts
+
+Revision ID: 04
+Revises: 03
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '04'
+down_revision = '03'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.add_column(sa.Column('packed_options', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('correct_bitmap', sa.LargeBinary(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.drop_column('correct_bitmap')
+        batch_op.drop_column('packed_options')
@@ -0,0 +1,36 @@
+"""add full-text search index over questions
+
+Revision ID: 06
+Revises: 05
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '06'
+down_revision = '05'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    from services.question_search import POSTGRESQL_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        for statement in POSTGRESQL_SEARCH_DDL:
+            op.execute(statement)
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('questions_fts_insert', 'questions_fts_delete', 'questions_fts_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS questions_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_questions_search_vector")
+        op.execute("ALTER TABLE questions DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,41 @@
+"""add immutable question versions and quiz content versions
+
+Revision ID: 07
+Revises: 06
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '07'
+down_revision = '06'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('questions') as batch_op:
+        batch_op.add_column(sa.Column('lineage_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('is_current', sa.Boolean(), nullable=False, server_default=sa.true()))
+        batch_op.create_foreign_key('fk_questions_lineage_id_questions', 'questions', ['lineage_id'], ['id'])
+        batch_op.create_index('ix_questions_lineage_id', ['lineage_id'])
+        batch_op.create_index('ix_questions_is_current', ['is_current'])
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.add_column(sa.Column('content_version', sa.String(16), nullable=True))
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.add_column(sa.Column('content_version', sa.String(16), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.drop_column('content_version')
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.drop_column('content_version')
+    with op.batch_alter_table('questions') as batch_op:
+        batch_op.drop_index('ix_questions_is_current')
+        batch_op.drop_index('ix_questions_lineage_id')
+        batch_op.drop_constraint('fk_questions_lineage_id_questions', type_='foreignkey')
+        batch_op.drop_column('is_current')
+        batch_op.drop_column('version')
+        batch_op.drop_column('lineage_id')
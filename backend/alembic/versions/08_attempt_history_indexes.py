@@ -0,0 +1,31 @@
+"""add per-user attempt history indexes
+
+Revision ID: 08
+Revises: 07
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '08'
+down_revision = '07'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        'ix_quiz_attempts_user_history', 'quiz_attempts',
+        ['user_id', sa.text('start_time DESC'), sa.text('id DESC')],
+        postgresql_include=['quiz_id', 'end_time', 'score', 'status'],
+    )
+    op.create_index(
+        'ix_quiz_attempt_archives_user_history', 'quiz_attempt_archives',
+        ['user_id', sa.text('start_time DESC'), sa.text('id DESC')],
+        postgresql_include=['quiz_id', 'end_time', 'score', 'status'],
+    )
+
+def downgrade():
+    op.drop_index('ix_quiz_attempt_archives_user_history', table_name='quiz_attempt_archives')
+    op.drop_index('ix_quiz_attempts_user_history', table_name='quiz_attempts')
@@ -0,0 +1,23 @@
+"""add quiz publish timestamp
+
+Revision ID: 09
+Revises: 08
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '09'
+down_revision = '08'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.add_column(sa.Column('published_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.drop_column('published_at')
@@ -0,0 +1,27 @@
+"""add quiz availability windows
+
+Revision ID: 10
+Revises: 09
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '10'
+down_revision = '09'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.add_column(sa.Column('opens_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('closes_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_quizzes_opens_at', ['opens_at'])
+
+def downgrade():
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.drop_index('ix_quizzes_opens_at')
+        batch_op.drop_column('closes_at')
+        batch_op.drop_column('opens_at')
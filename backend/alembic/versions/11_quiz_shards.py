@@ -0,0 +1,32 @@
+"""add quiz shard placement and attempt id blocks
+
+Revision ID: 11
+Revises: 10
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '11'
+down_revision = '10'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # NULL keeps a quiz's attempts on this database, where they already are
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.add_column(sa.Column('shard', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('moving_since', sa.DateTime(), nullable=True))
+    op.create_table(
+        'id_blocks',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('next_id', sa.Integer(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table('id_blocks')
+    with op.batch_alter_table('quizzes') as batch_op:
+        batch_op.drop_column('moving_since')
+        batch_op.drop_column('shard')
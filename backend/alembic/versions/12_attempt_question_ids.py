@@ -0,0 +1,25 @@
+"""store the questions drawn for each attempt
+
+Revision ID: 12
+Revises: 11
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '12'
+down_revision = '11'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Attempts started before this keep NULL and are graded on the current draw.
+    # Shard databases (SHARD_DATABASE_URLS) need the same column.
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.add_column(sa.Column('question_ids', sa.LargeBinary(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempts') as batch_op:
+        batch_op.drop_column('question_ids')
@@ -0,0 +1,26 @@
+"""record who created each question
+
+Revision ID: 13
+Revises: 12
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '13'
+down_revision = '12'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing questions keep NULL: only admins can edit them or see their answers
+    with op.batch_alter_table('questions') as batch_op:
+        batch_op.add_column(sa.Column('creator_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_questions_creator_id_users', 'users', ['creator_id'], ['id'])
+
+def downgrade():
+    with op.batch_alter_table('questions') as batch_op:
+        batch_op.drop_constraint('fk_questions_creator_id_users', type_='foreignkey')
+        batch_op.drop_column('creator_id')
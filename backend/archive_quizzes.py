@@ -0,0 +1,24 @@
+import argparse
+
+from database.db_connect import SessionLocal
+from services.archive_service import ARCHIVE_AFTER_DAYS, archive_closed_quizzes, archive_quiz
+
+def main():
+    parser = argparse.ArgumentParser(description="Move attempts of closed quizzes into the archive tables")
+    parser.add_argument("--quiz-id", type=int, action="append", help="Archive this quiz even if it has not closed (repeatable)")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="Archive quizzes that closed (plus the submit grace) at least this many days ago")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.quiz_id:
+            archived = {quiz_id: archive_quiz(db, quiz_id) for quiz_id in args.quiz_id}
+        else:
+            archived = archive_closed_quizzes(db, args.older_than_days)
+        print(f"Archived {sum(archived.values())} attempts across {len(archived)} quizzes")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
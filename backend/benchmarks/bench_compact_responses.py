@@ -0,0 +1,135 @@
+"""Storage size and read latency of row-per-answer vs packed attempt responses.
+
+Usage: python benchmarks/bench_compact_responses.py --questions 100 --students 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# The services import the app engine; it is never used here
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_unused.db')}")
+
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+
+import database.db_models as db_models
+import services.response_store as response_store
+
+OPTIONS_PER_QUESTION = 4
+
+
+def build(path: str, compact: bool, questions: int, students: int):
+    engine = create_engine(f"sqlite:///{path}")
+    db_models.Base.metadata.create_all(engine)
+    rng = random.Random(42)
+    with Session(engine) as db:
+        db.execute(insert(db_models.Quiz), [{
+            "id": 1, "creator_id": None, "title": "bench", "total_questions": questions,
+            "total_score": questions, "duration": 60,
+        }])
+        db.execute(insert(db_models.Question), [
+            {"id": q, "question_text": f"Question {q}"} for q in range(1, questions + 1)
+        ])
+        db.execute(insert(db_models.QuestionOption), [
+            {
+                "id": (q - 1) * OPTIONS_PER_QUESTION + o + 1,
+                "question_id": q,
+                "option": f"Option {o}",
+                "is_correct": o == 0,
+            }
+            for q in range(1, questions + 1) for o in range(OPTIONS_PER_QUESTION)
+        ])
+        db.execute(insert(db_models.QuizQuestion), [
+            {"quiz_id": 1, "question_id": q, "question_number": q, "marks": 1} for q in range(1, questions + 1)
+        ])
+
+        attempts, rows = [], []
+        for attempt_id in range(1, students + 1):
+            picks = [(q - 1) * OPTIONS_PER_QUESTION + rng.randrange(OPTIONS_PER_QUESTION) + 1
+                     for q in range(1, questions + 1)]
+            correct = [(option_id - 1) % OPTIONS_PER_QUESTION == 0 for option_id in picks]
+            attempt = {
+                "id": attempt_id, "quiz_id": 1, "user_id": attempt_id, "status": "completed",
+                "score": sum(correct) / questions * 100,
+                "packed_options": None, "correct_bitmap": None,
+            }
+            if compact:
+                attempt["packed_options"] = response_store.pack_options(picks)
+                attempt["correct_bitmap"] = response_store.pack_correct(correct)
+            else:
+                rows.extend(
+                    {
+                        "attempt_id": attempt_id,
+                        "question_id": q,
+                        "selected_option_id": option_id,
+                        "marks_obtained": int(is_correct),
+                    }
+                    for q, (option_id, is_correct) in enumerate(zip(picks, correct), 1)
+                )
+            attempts.append(attempt)
+        db.execute(insert(db_models.QuizAttempt), attempts)
+        if rows:
+            db.execute(insert(db_models.QuizResponse), rows)
+        db.commit()
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    return engine
+
+
+def read_one(db: Session, compact: bool, attempt_id: int):
+    if compact:
+        attempt = db.get(db_models.QuizAttempt, attempt_id)
+        return response_store.attempt_responses(db, attempt)
+    return db.execute(select(
+        db_models.QuizResponse.question_id,
+        db_models.QuizResponse.selected_option_id,
+        db_models.QuizResponse.marks_obtained,
+    ).where(db_models.QuizResponse.attempt_id == attempt_id)).all()
+
+
+def read_all(db: Session, compact: bool):
+    if compact:
+        return response_store.packed_response_columns(db, 1)
+    return db.execute(select(
+        db_models.QuizResponse.attempt_id,
+        db_models.QuizResponse.question_id,
+        db_models.QuizResponse.selected_option_id,
+        db_models.QuizResponse.marks_obtained,
+    )).all()
+
+
+def timed(fn, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{args.students} attempts x {args.questions} questions")
+        print(f"{'layout':<8} {'db size':>12} {'one attempt':>14} {'whole quiz':>14}")
+        for compact in (False, True):
+            path = os.path.join(tmp, "compact.db" if compact else "rows.db")
+            engine = build(path, compact, args.questions, args.students)
+            rng = random.Random(7)
+            with Session(engine) as db:
+                one = timed(lambda: read_one(db, compact, rng.randint(1, args.students)), args.repeat)
+                whole = timed(lambda: read_all(db, compact), 3)
+            engine.dispose()
+            size = os.path.getsize(path) / (1024 * 1024)
+            print(f"{'packed' if compact else 'rows':<8} {size:>9.1f} MB {one:>11.2f} ms {whole:>11.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
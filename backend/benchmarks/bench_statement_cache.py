@@ -0,0 +1,151 @@
+"""Per-call cost of building hot-path queries per request vs reusing prebuilt statements.
+
+Usage: python benchmarks/bench_statement_cache.py --questions 20 --attempts 200 --repeat 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# The services import the app engine; it is never used here
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_unused.db')}")
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, joinedload
+
+import database.db_connect as db_connect
+import database.db_models as db_models
+import services.auth as auth
+import services.quiz_service as quiz_service
+
+OPTIONS_PER_QUESTION = 4
+
+
+def build(path: str, questions: int, attempts: int):
+    engine = create_engine(f"sqlite:///{path}")
+    db_models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.execute(insert(db_models.User), [
+            {"id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com", "hashed_password": "x"}
+            for user_id in range(1, attempts + 1)
+        ])
+        db.execute(insert(db_models.Quiz), [{
+            "id": 1, "creator_id": 1, "title": "bench", "total_questions": questions,
+            "total_score": questions, "duration": 60,
+        }])
+        db.execute(insert(db_models.Question), [
+            {"id": q, "question_text": f"Question {q}"} for q in range(1, questions + 1)
+        ])
+        db.execute(insert(db_models.QuestionOption), [
+            {
+                "id": (q - 1) * OPTIONS_PER_QUESTION + o + 1,
+                "question_id": q,
+                "option": f"Option {o}",
+                "is_correct": o == 0,
+            }
+            for q in range(1, questions + 1) for o in range(OPTIONS_PER_QUESTION)
+        ])
+        db.execute(insert(db_models.QuizQuestion), [
+            {"quiz_id": 1, "question_id": q, "question_number": q, "marks": 1} for q in range(1, questions + 1)
+        ])
+        db.execute(insert(db_models.QuizAttempt), [
+            {"id": attempt_id, "quiz_id": 1, "user_id": attempt_id, "status": "in_progress"}
+            for attempt_id in range(1, attempts + 1)
+        ])
+        db.commit()
+    return engine
+
+
+# The per-request query construction the services used before
+def legacy_user(db, username):
+    return db.query(db_models.User).filter(db_models.User.username == username).first()
+
+def legacy_quiz(db, quiz_id):
+    return db.query(db_models.Quiz).filter(db_models.Quiz.id == quiz_id).options(
+        joinedload(db_models.Quiz.questions)
+        .joinedload(db_models.QuizQuestion.question)
+        .joinedload(db_models.Question.options)
+    ).first()
+
+def legacy_attempt(db, quiz_id, user_id):
+    return db.query(db_models.QuizAttempt).filter(
+        db_models.QuizAttempt.quiz_id == quiz_id,
+        db_models.QuizAttempt.user_id == user_id,
+        db_models.QuizAttempt.status == "in_progress"
+    ).order_by(db_models.QuizAttempt.start_time.desc()).first()
+
+def legacy_content_version(db, quiz_id):
+    return db.query(db_models.Quiz.content_version).filter(db_models.Quiz.id == quiz_id).first()
+
+
+def prebuilt_user(db, username):
+    return db.execute(auth._user_by_username, {"username": username}).scalar_one_or_none()
+
+def prebuilt_quiz(db, quiz_id):
+    return db.execute(quiz_service._quiz_with_questions_stmt, {"quiz_id": quiz_id}).unique().scalar_one_or_none()
+
+def prebuilt_attempt(db, quiz_id, user_id):
+    return db.execute(quiz_service._in_progress_attempt_stmt, {"quiz_id": quiz_id, "user_id": user_id}).scalars().first()
+
+def prebuilt_content_version(db, quiz_id):
+    return db.execute(quiz_service._content_version_stmt, {"quiz_id": quiz_id}).first()
+
+
+CASES = [
+    ("get_current_user", legacy_user, prebuilt_user, lambda i: ("user1",)),
+    ("get_quiz_by_id", legacy_quiz, prebuilt_quiz, lambda i: (1,)),
+    ("submit_quiz lookup", legacy_attempt, prebuilt_attempt, lambda i: (1, i % 50 + 1)),
+    ("content version", legacy_content_version, prebuilt_content_version, lambda i: (1,)),
+]
+
+
+def timed(db, fn, args, repeat: int):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(db, *args(i))
+        db.expunge_all()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def construct_only(repeat: int):
+    # What every get_quiz_by_id call paid before executing anything: the
+    # statement and its joinedload chain built from scratch
+    start = time.perf_counter()
+    for _ in range(repeat):
+        select(db_models.Quiz).where(db_models.Quiz.id == 1).options(
+            joinedload(db_models.Quiz.questions)
+            .joinedload(db_models.QuizQuestion.question)
+            .joinedload(db_models.Question.options)
+        )
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--attempts", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build(os.path.join(tmp, "bench.db"), args.questions, args.attempts)
+        print(f"building the get_quiz_by_id query + joinedload chain alone: {construct_only(args.repeat):.1f} us/call")
+        print(f"{'query':<20} {'per-request':>14} {'prebuilt':>14} {'saved':>8}")
+        with Session(engine) as db:
+            for name, legacy, prebuilt, call_args in CASES:
+                # Warm both so each side runs from the compiled cache
+                timed(db, legacy, call_args, 20)
+                timed(db, prebuilt, call_args, 20)
+                before = timed(db, legacy, call_args, args.repeat)
+                after = timed(db, prebuilt, call_args, args.repeat)
+                print(f"{name:<20} {before:>11.1f} us {after:>11.1f} us {(1 - after / before) * 100:>7.1f}%")
+        print(f"statement cache: {db_connect.counter('sql.statement_cache.hits')} hits, "
+              f"{db_connect.counter('sql.statement_cache.misses')} misses, "
+              f"hit rate {db_connect.statement_cache_hit_rate()}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
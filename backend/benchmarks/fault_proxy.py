@@ -0,0 +1,125 @@
+"""TCP proxy that sits between the app and its database and injects faults.
+
+Every byte is forwarded unchanged, but each chunk can be delayed
+(latency + random jitter) and live connections are reset at random, the way
+a flaky network, a failover or an idle-connection reaper would. Settings are
+plain attributes and can be changed while the proxy runs.
+
+Usage: python benchmarks/fault_proxy.py --listen 6432 --upstream localhost:5432 --latency-ms 20 --jitter-ms 30 --drops-per-minute 2
+"""
+import argparse
+import asyncio
+import random
+
+
+class FaultProxy:
+    def __init__(self, upstream_host: str, upstream_port: int, listen_host: str = "127.0.0.1", listen_port: int = 0,
+                 latency_ms: float = 0, jitter_ms: float = 0, drops_per_minute: float = 0, seed: int | None = None):
+        self.upstream_host = upstream_host
+        self.upstream_port = upstream_port
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.drops_per_minute = drops_per_minute
+        self.accepted = 0
+        self.dropped = 0
+        self.max_active = 0
+        self._rng = random.Random(seed)
+        self._connections = set()  # (client writer, upstream writer)
+        self._server = None
+        self._dropper = None
+
+    @property
+    def active(self) -> int:
+        return len(self._connections)
+
+    def set_faults(self, latency_ms: float = 0, jitter_ms: float = 0, drops_per_minute: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.drops_per_minute = drops_per_minute
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.listen_host, self.listen_port)
+        self.listen_port = self._server.sockets[0].getsockname()[1]
+        self._dropper = asyncio.create_task(self._drop_loop())
+        return self.listen_port
+
+    async def stop(self):
+        self._dropper.cancel()
+        self._server.close()
+        for pair in list(self._connections):
+            self._abort(pair)
+        await self._server.wait_closed()
+
+    def _delay(self) -> float:
+        return (self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000
+
+    async def _pump(self, reader, writer):
+        # One pump per direction, so chunks are delayed but never reordered
+        try:
+            while chunk := await reader.read(65536):
+                delay = self._delay()
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(chunk)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(self.upstream_host, self.upstream_port)
+        except OSError:
+            client_writer.close()
+            return
+        pair = (client_writer, upstream_writer)
+        self._connections.add(pair)
+        self.accepted += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.gather(
+                self._pump(client_reader, upstream_writer),
+                self._pump(upstream_reader, client_writer),
+            )
+        finally:
+            self._connections.discard(pair)
+
+    def _abort(self, pair):
+        # abort() skips the FIN handshake: both sides see a reset connection
+        for writer in pair:
+            writer.transport.abort()
+
+    async def _drop_loop(self):
+        while True:
+            await asyncio.sleep(1)
+            if self._connections and self._rng.random() < self.drops_per_minute / 60:
+                self._abort(self._rng.choice(list(self._connections)))
+                self.dropped += 1
+
+
+async def _serve(args):
+    host, _, port = args.upstream.rpartition(":")
+    proxy = FaultProxy(host or "localhost", int(port), listen_port=args.listen, latency_ms=args.latency_ms,
+                       jitter_ms=args.jitter_ms, drops_per_minute=args.drops_per_minute)
+    port = await proxy.start()
+    print(f"Proxying 127.0.0.1:{port} -> {args.upstream}")
+    while True:
+        await asyncio.sleep(10)
+        print(f"{proxy.active} active, {proxy.accepted} accepted, {proxy.dropped} dropped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--listen", type=int, default=6432)
+    parser.add_argument("--upstream", default="localhost:5432")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--drops-per-minute", type=float, default=0)
+    asyncio.run(_serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
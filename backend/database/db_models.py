@@ -2,7 +2,8 @@ from datetime import datetime, timezone
 from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
 from sqlalchemy.orm import declarative_base, relationship
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, DateTime
+from sqlalchemy import Boolean, Column, DDL, ForeignKey, ForeignKeyConstraint, Index, Integer, LargeBinary, MetaData, String, Text, DateTime, event, true
+from sqlalchemy.orm import attributes
 from sqlalchemy.dialects.mysql import INTEGER
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
@@ -17,14 +18,26 @@ class User(Base):
     email = Column(String(255), unique=True, index=True)
     hashed_password = Column(String(255))
     is_admin = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     quizzes = relationship("Quiz", back_populates="creator")
 
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=False)
+
 class Question(Base):
     __tablename__ = "questions"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     question_text = Column(String(255), nullable=False)
+    # Rows are immutable once written; an edit inserts a new version in the same lineage
+    lineage_id = Column(Integer, ForeignKey("questions.id"), nullable=True, index=True)  # First version's id
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    is_current = Column(Boolean, nullable=False, default=True, server_default=true(), index=True)
+    creator_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL: bank questions only admins manage
     options = relationship("QuestionOption", back_populates="question")
     quiz_questions = relationship("QuizQuestion", back_populates="question")
     responses = relationship("QuizResponse", back_populates="question")
@@ -48,7 +61,15 @@ class Quiz(Base):
     total_questions = Column(Integer, nullable=False)
     total_score = Column(Integer, nullable=False)
     duration = Column(Integer, nullable=False)  # Duration in minutes
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    questions_per_attempt = Column(Integer, nullable=True)  # Draw this many from the mapped pool per attempt
+    content_version = Column(String(16), nullable=True)  # Hash of settings + pinned question versions
+    published_at = Column(DateTime, nullable=True)  # Served from a shared snapshot once set
+    opens_at = Column(DateTime, nullable=True, index=True)  # Attempts may start from here (UTC)
+    closes_at = Column(DateTime, nullable=True)  # No new attempts or submissions after this (UTC)
+    archived_at = Column(DateTime, nullable=True)  # Attempts moved to quiz_attempt_archives
+    shard = Column(Integer, nullable=True)  # Shard database holding its attempts; NULL: this (catalog) database
+    moving_since = Column(DateTime, nullable=True)  # Attempts being copied to another shard; no writes meanwhile
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     questions = relationship("QuizQuestion", back_populates="quiz", lazy="joined")
     attempts = relationship("QuizAttempt", back_populates="quiz")
     creator = relationship("User", back_populates="quizzes")
@@ -70,14 +91,27 @@ class QuizAttempt(Base):
     id = Column(Integer, primary_key=True, index=True)
     quiz_id = Column(Integer, ForeignKey("quizzes.id"))
     user_id = Column(Integer, ForeignKey("users.id"))
-    start_time = Column(DateTime, default=datetime.now(timezone.utc))
+    start_time = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     end_time = Column(DateTime, nullable=True)
     score = Column(Float, nullable=True)
     status = Column(String(20))  # "in_progress" or "completed"
+    shuffle_seed = Column(Integer, nullable=True)  # Derives question/option order and pool draw
+    content_version = Column(String(16), nullable=True)  # Quiz content version the attempt was started on
+    question_ids = Column(LargeBinary, nullable=True)  # int32 ids of the questions drawn at start, canonical order
+    packed_options = Column(LargeBinary, nullable=True)  # int32 selected option ids in question order
+    correct_bitmap = Column(LargeBinary, nullable=True)  # One bit per packed option, set when correct
     quiz = relationship("Quiz", back_populates="attempts")
     user = relationship("User")
     responses = relationship("QuizResponse", back_populates="attempt")
 
+# Attempt history pages walk (user_id, start_time desc, id desc); PostgreSQL
+# answers them from the index alone
+Index(
+    "ix_quiz_attempts_user_history",
+    QuizAttempt.user_id, QuizAttempt.start_time.desc(), QuizAttempt.id.desc(),
+    postgresql_include=["quiz_id", "end_time", "score", "status"],
+)
+
 class QuizResponse(Base):
     __tablename__ = "quiz_responses"
 
@@ -88,4 +122,95 @@ class QuizResponse(Base):
     marks_obtained = Column(Integer, nullable=True, default=0)
     attempt = relationship("QuizAttempt", back_populates="responses")
     question = relationship("Question", back_populates="responses")
-    selected_option = relationship("QuestionOption", back_populates="responses")
\ No newline at end of file
+    selected_option = relationship("QuestionOption", back_populates="responses")
+
+# Graded attempts reference question and option rows, so their content must
+# never change in place
+IMMUTABLE_COLUMNS = {
+    Question: ("question_text",),
+    QuestionOption: ("question_id", "option", "is_correct"),
+}
+
+def _reject_in_place_edit(mapper, connection, target):
+    for column in IMMUTABLE_COLUMNS[type(target)]:
+        if attributes.get_history(target, column).has_changes():
+            raise ValueError(
+                f"{type(target).__name__}.{column} is immutable; create a new question version instead"
+            )
+
+for immutable_model in IMMUTABLE_COLUMNS:
+    event.listen(immutable_model, "before_update", _reject_in_place_edit)
+
+# Number of hash partitions for the archive table on PostgreSQL
+ARCHIVE_PARTITIONS = 8
+
+class QuizAttemptArchive(Base):
+    __tablename__ = "quiz_attempt_archives"
+    __table_args__ = {"postgresql_partition_by": "HASH (quiz_id)"}
+
+    # Keeps the original attempt id; quiz_id is part of the key so PostgreSQL
+    # can hash-partition the table by quiz
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    quiz_id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, index=True)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime, nullable=True)
+    score = Column(Float, nullable=True)
+    status = Column(String(20))
+    correct_answers = Column(Integer, nullable=False, default=0)
+    total_questions = Column(Integer, nullable=False, default=0)
+    responses = Column(LargeBinary, nullable=False)  # zlib-compressed response columns
+    archived_at = Column(DateTime, nullable=False)
+
+Index(
+    "ix_quiz_attempt_archives_user_history",
+    QuizAttemptArchive.user_id, QuizAttemptArchive.start_time.desc(), QuizAttemptArchive.id.desc(),
+    postgresql_include=["quiz_id", "end_time", "score", "status"],
+)
+
+def _add_archive_partitions(table):
+    for remainder in range(ARCHIVE_PARTITIONS):
+        event.listen(
+            table,
+            "after_create",
+            DDL(
+                f"CREATE TABLE quiz_attempt_archives_p{remainder} PARTITION OF quiz_attempt_archives "
+                f"FOR VALUES WITH (MODULUS {ARCHIVE_PARTITIONS}, REMAINDER {remainder})"
+            ).execute_if(dialect="postgresql"),
+        )
+
+_add_archive_partitions(QuizAttemptArchive.__table__)
+
+class QuizArchiveStats(Base):
+    __tablename__ = "quiz_archive_stats"
+
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), primary_key=True)
+    attempts = Column(Integer, nullable=False)
+    mean_score = Column(Float, nullable=True)
+    analytics = Column(Text, nullable=False)  # JSON item analysis frozen at archive time
+    archived_at = Column(DateTime, nullable=False)
+
+class IdBlock(Base):
+    __tablename__ = "id_blocks"
+
+    # Ids handed out in blocks from the catalog, so rows created on different
+    # shards never collide when a quiz is moved between them
+    name = Column(String(50), primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+# Attempt data, stored on the shard database of its quiz
+SHARDED_MODELS = (QuizAttempt, QuizResponse, QuizAttemptArchive)
+
+def create_shard_tables(bind):
+    # Shard databases hold no users, quizzes or questions to reference, so the
+    # sharded tables are created there without their foreign keys
+    metadata = MetaData()
+    for model in SHARDED_MODELS:
+        table = model.__table__.to_metadata(metadata)
+        table.constraints = {c for c in table.constraints if not isinstance(c, ForeignKeyConstraint)}
+        table.foreign_keys.clear()
+        for column in table.columns:
+            column.foreign_keys.clear()
+        if model is QuizAttemptArchive:
+            _add_archive_partitions(table)
+    metadata.create_all(bind)
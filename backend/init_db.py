@@ -1,11 +1,17 @@
 from sqlalchemy.orm import Session
-from database.db_connect import engine, SessionLocal
-from database.db_models import Base, User
+from database.db_connect import engine, shard_engines, SessionLocal
+from database.db_models import Base, User, create_shard_tables
 from services.auth import get_password_hash
+from services.question_search import ensure_search_index
+from services.quiz_service import refresh_quiz_snapshots
 
 def init_db():
     # Create all tables in the database
     Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    # Shards only hold attempt data
+    for shard_engine in shard_engines:
+        create_shard_tables(shard_engine)
     
     db = SessionLocal()
     try:
@@ -23,6 +29,10 @@ def init_db():
             print("Created test user 'admin' with password 'admin123'")
         else:
             print("Test user already exists")
+
+        written = refresh_quiz_snapshots(db)
+        if written:
+            print(f"Wrote {written} quiz snapshots")
     finally:
         db.close()
 
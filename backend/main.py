@@ -1,4 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import timedelta
+from functools import partial
 from dotenv import load_dotenv
 
 from slowapi import Limiter
@@ -9,16 +12,46 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
+from limits import parse
+from sqlalchemy.orm import Session
+
+import models.schemas as schemas
+import database.db_models as db_models
+import services.exam_scheduler as exam_scheduler
+import services.metrics as metrics
+import database.db_connect as db_connect
+from database.db_connect import get_db
+from routers import question, quiz, user
+from services.auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    authenticate_user,
+    create_access_token,
+    create_refresh_token,
+    decode_refresh_token,
+    get_current_admin,
+    revoke_refresh_token,
+)
+from services.admission import ADMISSION_ENABLED, AdmissionControlMiddleware
+from services.compression import CompressionMiddleware
 
-from routers import quiz, user
-from services.auth import authenticate_user, create_access_token
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Each worker pre-warms its own caches and pool ahead of scheduled quizzes
+    scheduler = asyncio.create_task(exam_scheduler.run_scheduler()) if exam_scheduler.SCHEDULER_ENABLED else None
+    yield
+    if scheduler:
+        scheduler.cancel()
 
 limiter = Limiter(key_func=get_remote_address)
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(CompressionMiddleware)
+if ADMISSION_ENABLED:
+    # Outside everything but CORS, so shed requests cost almost nothing
+    app.add_middleware(AdmissionControlMiddleware)
 
 # Update CORS middleware configuration
 app.add_middleware(
@@ -53,15 +86,83 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=30)
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(user.username),
+    }
+
+# Refreshes are limited per user: a classroom behind one NAT refreshes all at
+# once when its access tokens expire, so the per-IP limit only stops floods
+REFRESH_RATE_LIMIT = parse("30/minute")
+
+# Exchange a refresh token for a new access token without re-entering the password
+@app.post("/api/token/refresh", response_model=schemas.Token)
+@limiter.limit("1000/minute")
+async def refresh_access_token(
+    request: Request,
+    body: schemas.TokenRefresh,
+    db: Session = Depends(get_db)
+):
+    payload = decode_refresh_token(db, body.refresh_token)
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or revoked refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if limiter.enabled and not limiter.limiter.hit(REFRESH_RATE_LIMIT, "token_refresh", payload["sub"]):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many token refreshes, please retry shortly",
+        )
+    # Rotate: the presented refresh token is single use, and a concurrent
+    # refresh with the same token loses
+    if not revoke_refresh_token(db, payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or revoked refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token = create_access_token(
+        data={"sub": payload["sub"]}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(payload["sub"]),
+    }
+
+@app.post("/api/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_token(
+    body: schemas.TokenRefresh,
+    db: Session = Depends(get_db)
+):
+    payload = decode_refresh_token(db, body.refresh_token)
+    if payload:
+        revoke_refresh_token(db, payload)
+# The database layer counts statement cache hits and sessions itself and
+# knows nothing of services.metrics; publish them alongside the rest
+for name in db_connect.COUNTERS:
+    metrics.register_gauge(name, partial(db_connect.counter, name))
+metrics.register_gauge("sql.statement_cache.hit_rate", db_connect.statement_cache_hit_rate)
+metrics.register_gauge("db.pool.checked_out", db_connect.checked_out_connections)
+metrics.register_gauge("db.sessions.open", db_connect.open_sessions)
+
+# Process-local counters: compression savings, cache hit rates, queue depths
+@app.get("/api/metrics")
+async def get_metrics(current_user: db_models.User = Depends(get_current_admin)):
+    return metrics.snapshot()
+
 @app.get("/", tags=["Root"])
 async def root():
     return {"message": "Welcome to the Online Quiz System!"}
 
 # Include routers
 app.include_router(quiz.router)
+app.include_router(question.router)
 app.include_router(user.router)
\ No newline at end of file
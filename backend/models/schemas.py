@@ -20,12 +20,26 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class ProvisionError(BaseModel):
+    row: int
+    username: Optional[str] = None
+    error: str
+
+class ProvisionResult(BaseModel):
+    created: int
+    failed: int
+    errors: List[ProvisionError]
+    seconds: float
+    hash_seconds: float
+    users_per_second: float
+
 class QuestionOptionBase(BaseModel):
     option_text: str
     is_correct: bool
 
 class QuestionOption(QuestionOptionBase):
     id: int  # UNSIGNED INT
+    is_correct: bool | None = None  # Only shown to admins and the question's creator
 
     class Config:
         from_attributes = True
@@ -43,6 +57,20 @@ class Question(QuestionBase):
     class Config:
         from_attributes = True
         
+class QuestionVersion(Question):
+    lineage_id: int
+    version: int
+    is_current: bool
+
+class QuestionSearchHit(BaseModel):
+    id: int
+    question_text: str
+    rank: float
+
+class QuestionSearchPage(BaseModel):
+    items: List[QuestionSearchHit]
+    next_cursor: str | None
+
 class QuizQuestionBase(BaseModel):
     question_number: int
     marks: int
@@ -61,6 +89,9 @@ class QuizBase(BaseModel):
     total_questions: int
     total_score: int
     duration: int
+    questions_per_attempt: int | None = None
+    opens_at: datetime | None = None
+    closes_at: datetime | None = None
 
 class QuizCreate(QuizBase):
     pass
@@ -101,6 +132,41 @@ class QuizScore(BaseModel):
     class Config:
         from_attributes = True
 
+class AttemptHistoryItem(BaseModel):
+    attempt_id: int
+    quiz_id: int
+    quiz_title: str | None
+    start_time: datetime
+    end_time: datetime | None
+    score: float | None
+    status: str
+    archived: bool
+
+class AttemptHistoryPage(BaseModel):
+    items: List[AttemptHistoryItem]
+    next_cursor: str | None
+
+class OptionAnalytics(BaseModel):
+    option_id: int
+    is_correct: bool
+    count: int
+    proportion: float
+
+class QuestionAnalytics(BaseModel):
+    question_id: int
+    question_number: int
+    responses: int
+    difficulty: float | None
+    discrimination: float | None
+    options: List[OptionAnalytics]
+
+class QuizAnalytics(BaseModel):
+    quiz_id: int
+    attempts: int
+    mean_score: float | None
+    kr20: float | None
+    questions: List[QuestionAnalytics]
+
 class QuizAttemptCreate(BaseModel):
     responses: List[QuizResponse]
 
@@ -120,6 +186,10 @@ class QuizAttempt(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 class QuizStartResponse(BaseModel):
     attempt_id: int
@@ -0,0 +1,35 @@
+import argparse
+import json
+import os
+
+from database.db_connect import SessionLocal
+from services.user_service import PROVISION_BATCH_SIZE, parse_users, provision_users
+
+def main():
+    parser = argparse.ArgumentParser(description="Create many users at once from a CSV or JSONL file")
+    parser.add_argument("path", help="CSV with a header row, or JSONL with one object per line "
+                                     "(fields: username, email, password, is_admin)")
+    parser.add_argument("--format", choices=["csv", "jsonl"],
+                        help="File format (default: from the file extension)")
+    parser.add_argument("--batch-size", type=int, default=PROVISION_BATCH_SIZE,
+                        help="Users per multi-row INSERT")
+    args = parser.parse_args()
+
+    fmt = args.format or ("jsonl" if os.path.splitext(args.path)[1].lower() in (".jsonl", ".ndjson") else "csv")
+    with open(args.path, encoding="utf-8-sig") as f:
+        rows = parse_users(f.read(), fmt)
+
+    db = SessionLocal()
+    try:
+        result = provision_users(db, rows, args.batch_size)
+    finally:
+        db.close()
+
+    for error in result["errors"]:
+        print(json.dumps(error))
+    print(f"Created {result['created']} users, {result['failed']} rows failed "
+          f"in {result['seconds']:.2f}s ({result['users_per_second']:.1f} users/s, "
+          f"{result['hash_seconds']:.2f}s hashing)")
+
+if __name__ == "__main__":
+    main()
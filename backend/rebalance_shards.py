@@ -0,0 +1,60 @@
+import argparse
+
+from database.db_connect import SessionLocal
+from services.shard_service import (
+    MOVE_SETTLE_SECONDS,
+    location_name,
+    move_quiz,
+    purge_orphans,
+    rebalance,
+    shard_report,
+)
+
+def parse_location(value: str):
+    return None if value == "catalog" else int(value)
+
+def print_report(db):
+    for shard, placed in shard_report(db).items():
+        print(f"{location_name(shard)}: {len(placed['quizzes'])} quizzes, {placed['live']} live attempts, "
+              f"{placed['archived']} archived, {len(placed['orphans'])} quizzes with leftover rows")
+
+def main():
+    parser = argparse.ArgumentParser(description="Balance quiz attempt data across the shard databases")
+    parser.add_argument("--report", action="store_true", help="Show attempts per shard and exit")
+    parser.add_argument("--move-quiz", type=int, help="Move this quiz's attempts to --to")
+    parser.add_argument("--to", help="Target shard index, or 'catalog'")
+    parser.add_argument("--drain-catalog", action="store_true",
+                        help="Also move quizzes whose attempts still live on the catalog database")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Stop once shards are within this fraction of the mean load")
+    parser.add_argument("--settle-seconds", type=float, default=MOVE_SETTLE_SECONDS)
+    parser.add_argument("--force", action="store_true",
+                        help="With --move-quiz: move even while the quiz is open or has attempts in progress")
+    parser.add_argument("--purge-orphans", action="store_true",
+                        help="Delete rows interrupted moves left on databases a quiz is not placed on")
+    parser.add_argument("--dry-run", action="store_true", help="Print the planned moves without moving anything")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.report:
+            print_report(db)
+        elif args.purge_orphans:
+            purged = purge_orphans(db)
+            print(f"Purged leftover rows of {len(purged)} quizzes")
+        elif args.move_quiz is not None:
+            if args.to is None:
+                parser.error("--move-quiz needs --to")
+            move_quiz(db, args.move_quiz, parse_location(args.to), args.settle_seconds, args.force)
+        else:
+            moves = rebalance(db, args.drain_catalog, args.tolerance, args.dry_run, args.settle_seconds)
+            if args.dry_run:
+                for quiz_id, source, target, weight in moves:
+                    print(f"quiz {quiz_id}: {location_name(source)} -> {location_name(target)} ({weight} live attempts)")
+            print(f"{len(moves)} quizzes {'to move' if args.dry_run else 'moved'}")
+            print_report(db)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
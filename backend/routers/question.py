@@ -0,0 +1,86 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+import database.db_models as db_models
+import models.schemas as schemas
+import services.question_search as question_search
+import services.question_service as question_service
+from database.db_connect import get_db
+from services.auth import get_current_admin, get_current_user
+
+router = APIRouter(
+    prefix="/api/questions",
+    tags=["questions"],
+    dependencies=[Depends(get_current_user)]  # Apply auth to all routes
+)
+
+@router.get("/search", response_model=schemas.QuestionSearchPage, operation_id="search_questions")
+async def search_questions(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=question_search.MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user)
+):
+    try:
+        return question_search.search_questions(db, q, limit, cursor)
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+
+
+@router.post("/", response_model=schemas.QuestionVersion, operation_id="create_question")
+async def create_question(
+    question: schemas.QuestionCreate,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_admin)
+):
+    return question_service.create_question(db, question, current_user.id)
+
+@router.get("/{question_id}", response_model=schemas.QuestionVersion, operation_id="get_question")
+async def get_question(
+    question_id: int,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user)
+):
+    # Options carry is_correct only for admins and the question's creator
+    try:
+        return question_service.get_question(db, question_id, current_user)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(ve))
+
+@router.put("/{question_id}", response_model=schemas.QuestionVersion, operation_id="edit_question")
+async def edit_question(
+    question_id: int,
+    question: schemas.QuestionCreate,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user)
+):
+    # Returns the new version; quizzes keep the version they pinned until remapped
+    try:
+        return question_service.create_question_version(db, question_id, question, current_user)
+    except ValueError as ve:
+        error_msg = str(ve)
+        if "not found" in error_msg.lower():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error_msg)
+        if "not allowed" in error_msg.lower():
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=error_msg)
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=error_msg)
+
+@router.get("/{question_id}/versions", response_model=List[schemas.QuestionVersion], operation_id="list_question_versions")
+async def list_question_versions(
+    question_id: int,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user)
+):
+    try:
+        return question_service.get_question_versions(db, question_id, current_user)
+    except ValueError as ve:
+        error_msg = str(ve)
+        if "not allowed" in error_msg.lower():
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=error_msg)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error_msg)
\ No newline at end of file
@@ -1,46 +1,98 @@
 from typing import List
-from fastapi import APIRouter, Depends, Request, HTTPException, status
+from fastapi import APIRouter, Depends, Query, Request, Response, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 import database.db_models as db_models
 import models.schemas as schemas
+import services.analytics_service as analytics_service
+import services.live_hub as live_hub
 import services.quiz_service as quiz_service
-from database.db_connect import get_db
-from services.auth import get_current_user
+from database.db_connect import SessionLocal, engine, get_db, get_read_db_for, mark_recent_write, reads_from_primary
+from services.auth import get_current_user, oauth2_scheme, user_from_token
 from models.schemas import QuizAttemptCreate, QuizCreate, QuizQuestionMap, QuizScore, QuizAttempt
 
+# Every route authenticates through its current_user dependency: writes on
+# the primary session, reads on their read session, so a request never holds
+# a second connection just to look up its user
 router = APIRouter(
     prefix="/api/quizzes",
     tags=["quizzes"],
-    dependencies=[Depends(get_current_user)]  # Apply auth to all routes
 )
 
+def get_read_db(request: Request):
+    # Route read-only endpoints to a replica, keeping recent writers on the primary
+    yield from get_read_db_for(reads_from_primary(request.cookies))
+
+def get_current_reader(token: str = Depends(oauth2_scheme), db: Session = Depends(get_read_db)):
+    try:
+        return user_from_token(db, token)
+    except HTTPException:
+        if db.get_bind() is engine:
+            raise
+    # A user created moments ago may not have reached the replica yet
+    with SessionLocal() as primary_db:
+        return user_from_token(primary_db, token)
+
 @router.get("/", response_model=List[schemas.Quiz], operation_id="list_all_quizzes")
 async def get_quizzes(
-    db: Session = Depends(get_db),
-    current_user: db_models.User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: db_models.User = Depends(get_current_reader)
 ):
     return quiz_service.get_all_quizzes(db)
 
 @router.post("/", response_model=schemas.Quiz)
 async def create_quiz(
     quiz: schemas.QuizCreate,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user)
 ):
     try:
-        return quiz_service.create_quiz(db, quiz, current_user.id)
+        db_quiz = quiz_service.create_quiz(db, quiz, current_user.id)
+        mark_recent_write(response)
+        return db_quiz
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Plain def: remapping a published quiz rewrites (and recompresses) its
+# snapshot, which must not run on the event loop
 @router.post("/{quiz_id}/questions/", response_model=dict, operation_id="map_quiz_questions")
-async def map_questions(
+def map_questions(
     quiz_id: int,
     question_map: QuizQuestionMap,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user)
 ):
-    return quiz_service.map_quiz_questions(db, quiz_id, question_map)
+    try:
+        result = quiz_service.map_quiz_questions(db, quiz_id, question_map)
+    except ValueError as ve:
+        error_msg = str(ve)
+        if "quiz with id" in error_msg.lower():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error_msg)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
+    mark_recent_write(response)
+    return result
+
+@router.post("/{quiz_id}/publish/", response_model=dict, operation_id="publish_quiz")
+def publish_quiz(
+    quiz_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_user)
+):
+    try:
+        result = quiz_service.publish_quiz(db, quiz_id)
+    except ValueError as ve:
+        error_msg = str(ve)
+        if "not found" in error_msg.lower():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error_msg)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
+    mark_recent_write(response)
+    return result
 
 @router.get("/user", response_model=List[schemas.Quiz], operation_id="list_user_quizzes")
 def read_user_quizzes(
@@ -49,10 +101,25 @@ def read_user_quizzes(
 ):
     return quiz_service.get_user_quizzes(db, current_user.id)
 
+# Must stay above /{quiz_id} so "attempts" is not parsed as a quiz id
+@router.get("/attempts", response_model=schemas.AttemptHistoryPage, operation_id="list_my_attempts")
+async def get_my_attempts(
+    limit: int = Query(20, ge=1, le=quiz_service.HISTORY_MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: Session = Depends(get_read_db),
+    current_user: db_models.User = Depends(get_current_reader)
+):
+    try:
+        return quiz_service.get_user_attempt_history(db, current_user.id, limit, cursor)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
 @router.get("/{quiz_id}", response_model=schemas.Quiz)
 async def get_quiz(
     quiz_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: db_models.User = Depends(get_current_reader)
 ):
     """Get quiz details - public endpoint, no authentication required"""
     print(f"Processing public access request for quiz {quiz_id}")
@@ -73,8 +140,12 @@ async def get_quiz(
                 detail="Quiz ID is required"
             )
             
-        quiz = quiz_service.get_quiz_by_id(db, quiz_id)
-        return quiz
+        # Not before opens_at: the payload is the exam itself
+        quiz_service.check_quiz_visible(db, quiz_id, current_user)
+
+        # Precompressed bytes for this content version, picked by Accept-Encoding
+        body = quiz_service.get_cached_quiz_body(db, quiz_id)
+        return body.response(request.headers.get("accept-encoding", ""))
     except ValueError as ve:
         error_msg = str(ve)
         if "not found" in error_msg.lower() or "no questions" in error_msg.lower() or "no valid questions" in error_msg.lower():
@@ -82,6 +153,8 @@ async def get_quiz(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=error_msg
             )
+        if "opens at" in error_msg.lower():
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=error_msg)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=error_msg
@@ -98,11 +171,15 @@ async def get_quiz(
 @router.post("/{quiz_id}/start/", response_model=schemas.QuizStartResponse)
 def start_quiz(
     quiz_id: int,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: schemas.User = Depends(get_current_user)
 ):
     # Get quiz data first
-    quiz_data = quiz_service.get_quiz_by_id(db, quiz_id)
+    try:
+        quiz_data = quiz_service.get_cached_quiz(db, quiz_id)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(ve))
     if not quiz_data:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -110,17 +187,24 @@ def start_quiz(
         )
     
     # Start the quiz attempt
-    attempt = quiz_service.start_quiz(db, quiz_id, current_user.id)
+    try:
+        attempt = quiz_service.start_quiz(db, quiz_id, current_user.id, quiz_data)
+    except ValueError as ve:
+        # Outside the quiz's availability window
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(ve))
+    except quiz_service.QuizMovingError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "2"})
     if not attempt:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Could not start quiz"
         )
+    mark_recent_write(response)
 
-    # Return both the attempt ID and quiz data
+    # Return both the attempt ID and the quiz laid out for this attempt
     return {
         "attempt_id": attempt.id,
-        "quiz": quiz_data,
+        "quiz": quiz_service.shuffle_quiz(quiz_data, attempt.shuffle_seed),
     }
 
 @router.post("/{quiz_id}/submit/", response_model=schemas.QuizAttempt, operation_id="submit_quiz_attempt")
@@ -128,17 +212,30 @@ async def submit_quiz(
     request: Request,
     quiz_id: int,
     responses: QuizAttemptCreate,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: db_models.User = Depends(get_current_user)
 ):
-    return quiz_service.submit_quiz(db, quiz_id, current_user.id, responses)
+    try:
+        attempt = quiz_service.submit_quiz(db, quiz_id, current_user.id, responses)
+    except ValueError as ve:
+        error_msg = str(ve)
+        if "not found" in error_msg.lower() or "no questions" in error_msg.lower() or "no valid questions" in error_msg.lower():
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=error_msg)
+        # Past the quiz's closing time
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=error_msg)
+    except quiz_service.QuizMovingError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "2"})
+    # Keep this client's follow-up reads (scores, response) on the primary
+    mark_recent_write(response)
+    return attempt
 
 @router.get("/{quiz_id}/participants/", response_model=List[schemas.QuizAttempt], operation_id="list_quiz_participants")
 async def get_quiz_participants(
     request: Request,
     quiz_id: int,
-    db: Session = Depends(get_db),
-    current_user: db_models.User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: db_models.User = Depends(get_current_reader)
 ):
     return quiz_service.get_quiz_participants(db, quiz_id)
 
@@ -146,8 +243,8 @@ async def get_quiz_participants(
 async def get_quiz_response(
     request: Request,
     quiz_id: int,
-    db: Session = Depends(get_db),
-    current_user: db_models.User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: db_models.User = Depends(get_current_reader)
 ):
     return quiz_service.get_quiz_user_response(db, quiz_id, current_user.id)
 
@@ -155,8 +252,40 @@ async def get_quiz_response(
 async def get_quiz_scores(
     request: Request,
     quiz_id: int,
-    db: Session = Depends(get_db),
-    current_user: db_models.User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: db_models.User = Depends(get_current_reader)
 ):
     from main import limiter  # Import here to avoid circular dependency
-    return quiz_service.get_quiz_scores(db, quiz_id)
\ No newline at end of file
+    return quiz_service.get_quiz_scores(db, quiz_id)
+
+@router.get("/{quiz_id}/analytics/", response_model=schemas.QuizAnalytics, operation_id="get_quiz_analytics")
+async def get_quiz_analytics(
+    request: Request,
+    quiz_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: db_models.User = Depends(get_current_reader)
+):
+    try:
+        quiz_service.check_quiz_owner(db, quiz_id, current_user)
+        return analytics_service.get_quiz_item_analysis(db, quiz_id)
+    except ValueError as ve:
+        error_msg = str(ve)
+        if "may view" in error_msg:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=error_msg)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=error_msg
+        )
+
+@router.get("/{quiz_id}/live/", operation_id="stream_quiz_events")
+async def stream_quiz_events(
+    quiz_id: int,
+    current_user: db_models.User = Depends(get_current_user)
+):
+    # Server-Sent Events feed of attempt_started / attempt_completed events,
+    # replacing polling of /scores/ and /participants/
+    return StreamingResponse(
+        live_hub.hub.stream(quiz_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
\ No newline at end of file
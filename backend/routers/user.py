@@ -1,6 +1,7 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from sqlalchemy.orm import Session
@@ -8,6 +9,7 @@ from sqlalchemy.orm import Session
 import database.db_models as db_models
 import models.schemas as schemas
 from database.db_connect import get_db
+import services.user_service as user_service
 from services.auth import get_current_admin, get_password_hash
 
 
@@ -38,6 +40,28 @@ async def create_user(
     db.refresh(db_user)
     return db_user
 
+@router.post("/bulk", response_model=schemas.ProvisionResult)
+@limiter.limit("10/minute")
+async def provision_users(
+    request: Request,
+    file: UploadFile = File(...),
+    format: str = Query(None, pattern="^(csv|jsonl)$"),
+    db: Session = Depends(get_db),
+    current_user: db_models.User = Depends(get_current_admin)
+):
+    fmt = format or ("jsonl" if (file.filename or "").lower().endswith((".jsonl", ".ndjson")) else "csv")
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload must be UTF-8 text")
+
+    # Hashing and inserts run off the event loop so other requests keep flowing
+    try:
+        rows = user_service.parse_users(content, fmt)
+        return await run_in_threadpool(user_service.provision_users, db, rows)
+    except ValueError as ve:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(ve))
+
 @router.get("/", response_model=List[schemas.User])
 @limiter.limit("100/second")
 async def get_users(
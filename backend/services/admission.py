@@ -0,0 +1,151 @@
+import asyncio
+import os
+import re
+
+from starlette.responses import JSONResponse
+
+import services.metrics as metrics
+from database.db_connect import DB_MAX_OVERFLOW, DB_POOL_SIZE
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+
+
+def _setting(priority: str, name: str, default):
+    return type(default)(os.getenv(f"ADMISSION_{priority.upper()}_{name}", default))
+
+
+class PriorityClass:
+    # Up to `concurrency` requests of this class run at once; the next
+    # `queue_size` wait at most `deadline` seconds for a slot. Classes with
+    # `shed_when_busy` are refused outright while a more important class has
+    # requests queued.
+    def __init__(self, name: str, rank: int, concurrency: int, queue_size: int, deadline: float,
+                 retry_after: int, shed_when_busy: bool):
+        self.name = name
+        self.rank = rank
+        self.concurrency = _setting(name, "CONCURRENCY", concurrency)
+        self.queue_size = _setting(name, "QUEUE", queue_size)
+        self.deadline = _setting(name, "DEADLINE_SECONDS", float(deadline))
+        self.retry_after = retry_after
+        self.shed_when_busy = shed_when_busy
+        self.active = 0
+        self.queued = 0
+        self._slots = asyncio.Semaphore(self.concurrency)
+        metrics.register_gauge(f"admission.{name}.active", lambda: self.active)
+        metrics.register_gauge(f"admission.{name}.queued", lambda: self.queued)
+
+
+# Connections one admitted request holds on any single pool. A request runs
+# on one session; a quiz's shard is a second connection, but on the shard's
+# own pool, so with the defaults nothing holds two from the same pool.
+CONNECTIONS_PER_REQUEST = int(os.getenv("ADMISSION_CONNECTIONS_PER_REQUEST", "1"))
+
+# Share of the pool per class: at the default 15 connections (5 + 10
+# overflow) that is 6/4/3/2, so submits always have capacity reserved,
+# whatever the scoreboards and listings are doing
+CONCURRENCY_WEIGHTS = {"critical": 6, "high": 4, "normal": 3, "low": 2}
+
+
+def _split(budget: int, weights: dict):
+    # Largest-remainder split of `budget` request slots, at least one per class
+    total = sum(weights.values())
+    shares = {name: budget * weight / total for name, weight in weights.items()}
+    slots = {name: max(1, int(share)) for name, share in shares.items()}
+    spare = budget - sum(slots.values())
+    for name in sorted(shares, key=lambda name: shares[name] - slots[name], reverse=True)[:max(0, spare)]:
+        slots[name] += 1
+    return slots
+
+
+_concurrency = _split((DB_POOL_SIZE + DB_MAX_OVERFLOW) // CONNECTIONS_PER_REQUEST, CONCURRENCY_WEIGHTS)
+
+PRIORITY_CLASSES = {
+    priority.name: priority for priority in (
+        PriorityClass("critical", 0, _concurrency["critical"], queue_size=200, deadline=10, retry_after=1, shed_when_busy=False),
+        PriorityClass("high", 1, _concurrency["high"], queue_size=100, deadline=5, retry_after=2, shed_when_busy=False),
+        PriorityClass("normal", 2, _concurrency["normal"], queue_size=50, deadline=2, retry_after=3, shed_when_busy=True),
+        PriorityClass("low", 3, _concurrency["low"], queue_size=20, deadline=0.5, retry_after=5, shed_when_busy=True),
+    )
+}
+
+# (method, path pattern, class); anything unlisted is "normal"
+ROUTE_CLASSES = [
+    ("POST", re.compile(r"^/api/quizzes/\d+/submit/?$"), "critical"),
+    ("POST", re.compile(r"^/api/quizzes/\d+/start/?$"), "high"),
+    ("POST", re.compile(r"^/api/token(/refresh)?/?$"), "high"),
+    ("GET", re.compile(r"^/api/quizzes/?$"), "low"),
+    ("GET", re.compile(r"^/api/quizzes/attempts/?$"), "low"),
+    ("GET", re.compile(r"^/api/quizzes/\d+/(scores|participants|analytics)/?$"), "low"),
+    ("GET", re.compile(r"^/api/questions/search/?$"), "low"),
+    ("GET", re.compile(r"^/users/?$"), "low"),
+    ("POST", re.compile(r"^/users/bulk/?$"), "low"),
+]
+
+# Long-lived streams and observability never queue behind anything
+EXEMPT_PATHS = re.compile(r"^/(api/quizzes/\d+/live/?|api/metrics/?|docs.*|openapi\.json)?$")
+
+
+def classify(method: str, path: str):
+    if method == "OPTIONS" or EXEMPT_PATHS.match(path):
+        return None
+    for route_method, pattern, priority in ROUTE_CLASSES:
+        if method == route_method and pattern.match(path):
+            return PRIORITY_CLASSES[priority]
+    return PRIORITY_CLASSES["normal"]
+
+
+def _more_important_waiting(priority: PriorityClass) -> bool:
+    return any(other.queued for other in PRIORITY_CLASSES.values() if other.rank < priority.rank)
+
+
+async def _shed(priority: PriorityClass, reason: str, scope, receive, send):
+    metrics.incr(f"admission.{priority.name}.{reason}")
+    response = JSONResponse(
+        {"detail": "Server is busy, please retry shortly"},
+        status_code=503,
+        headers={"Retry-After": str(priority.retry_after)},
+    )
+    await response(scope, receive, send)
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority = classify(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        # A backlog of more important work means the pool is the bottleneck:
+        # give way instead of taking a connection it needs
+        if priority.shed_when_busy and _more_important_waiting(priority):
+            await _shed(priority, "shed", scope, receive, send)
+            return
+
+        if priority._slots.locked():
+            if priority.queued >= priority.queue_size:
+                await _shed(priority, "shed", scope, receive, send)
+                return
+            priority.queued += 1
+            try:
+                await asyncio.wait_for(priority._slots.acquire(), priority.deadline)
+            except asyncio.TimeoutError:
+                await _shed(priority, "timed_out", scope, receive, send)
+                return
+            finally:
+                priority.queued -= 1
+        else:
+            await priority._slots.acquire()  # a slot is free: no wait
+
+        priority.active += 1
+        metrics.incr(f"admission.{priority.name}.admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            priority.active -= 1
+            priority._slots.release()
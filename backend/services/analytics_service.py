@@ -0,0 +1,229 @@
+import json
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import database.db_models as db_models
+from database.db_connect import quiz_shard_session
+from services.response_store import packed_response_columns, unpack_question_ids
+
+# Rows fetched per round trip when streaming responses out of the database
+CHUNK_SIZE = 50000
+
+# quiz_id -> ((content version, archived, completed attempts), analytics).
+# Reads may come from a lagging replica, so an entry is only reused while the
+# data it was computed from is unchanged rather than until the next submit;
+# a replica that catches up simply produces a new key.
+_analytics_cache = {}
+
+
+def invalidate_quiz_analytics(quiz_id: int):
+    _analytics_cache.pop(quiz_id, None)
+
+
+def fetch_columns(db: Session, stmt, width: int):
+    # Pull the result set in chunks straight into int64 arrays instead of
+    # materialising one ORM object per row
+    result = db.execute(stmt.execution_options(yield_per=CHUNK_SIZE))
+    chunks = [np.array(partition, dtype=np.int64) for partition in result.partitions()]
+    if not chunks:
+        return np.empty((0, width), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def _nan_to_none(values):
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def _point_biserial(matrix: np.ndarray, totals: np.ndarray):
+    # Corrected item-total correlation: each item against the total of the
+    # other items, over the attempts that drew it (NaN cells are undrawn)
+    drawn = ~np.isnan(matrix)
+    item = np.where(drawn, matrix, 0.0)
+    rest = totals[:, None] - item
+    with np.errstate(invalid="ignore", divide="ignore"):
+        counts = drawn.sum(axis=0)
+        item_dev = np.where(drawn, item - item.sum(axis=0) / counts, 0.0)
+        rest_dev = np.where(drawn, rest - np.where(drawn, rest, 0.0).sum(axis=0) / counts, 0.0)
+        numerator = (item_dev * rest_dev).sum(axis=0)
+        denominator = np.sqrt((item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0))
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def _kr20(matrix: np.ndarray, totals: np.ndarray):
+    # With a question pool every attempt sees k of the n items, so the item
+    # variances are scaled to what one k-item form carries; without a pool
+    # k == n and this is plain KR-20
+    drawn = ~np.isnan(matrix)
+    seen = drawn.any(axis=0)
+    n_items = int(seen.sum())
+    if matrix.shape[0] < 2 or n_items < 2:
+        return None
+    k = drawn.sum(axis=1).mean()
+    variance = totals.var()
+    if k <= 1 or variance == 0:
+        return None
+    p = np.nanmean(matrix[:, seen], axis=0)
+    return float(k / (k - 1) * (1 - k / n_items * (p * (1 - p)).sum() / variance))
+
+
+def _positions(keys: np.ndarray, values: np.ndarray):
+    # Index of each value in `keys` (any order) and whether it is there at all
+    order = np.argsort(keys, kind="stable")
+    ordered = keys[order]
+    pos = np.minimum(np.searchsorted(ordered, values), max(len(ordered) - 1, 0))
+    if not len(ordered):
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values), dtype=bool)
+    return order[pos], ordered[pos] == values
+
+
+def _completed_attempts(db: Session, quiz_id: int) -> int:
+    return quiz_shard_session(db, quiz_id).execute(
+        select(func.count()).select_from(db_models.QuizAttempt).where(
+            db_models.QuizAttempt.quiz_id == quiz_id,
+            db_models.QuizAttempt.status == "completed",
+        )
+    ).scalar()
+
+
+def get_quiz_item_analysis(db: Session, quiz_id: int):
+    quiz = db.query(
+        db_models.Quiz.id, db_models.Quiz.archived_at, db_models.Quiz.content_version
+    ).filter(db_models.Quiz.id == quiz_id).first()
+    if not quiz:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+
+    key = (quiz.content_version, quiz.archived_at is not None, _completed_attempts(db, quiz_id))
+    cached = _analytics_cache.get(quiz_id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    # Archived quizzes keep the analysis frozen when their responses were moved out
+    if quiz.archived_at:
+        stats = db.query(db_models.QuizArchiveStats.analytics).filter(
+            db_models.QuizArchiveStats.quiz_id == quiz_id
+        ).scalar()
+        if stats:
+            analytics = json.loads(stats)
+            _analytics_cache[quiz_id] = (key, analytics)
+            return analytics
+
+    questions = fetch_columns(db, select(
+        db_models.QuizQuestion.question_id,
+        db_models.QuizQuestion.question_number,
+    ).where(
+        db_models.QuizQuestion.quiz_id == quiz_id
+    ).order_by(db_models.QuizQuestion.question_number), 2)
+    question_ids = questions[:, 0]
+
+    options = fetch_columns(db, select(
+        db_models.QuestionOption.id,
+        db_models.QuestionOption.question_id,
+        db_models.QuestionOption.is_correct,
+    ).where(
+        db_models.QuestionOption.question_id.in_(question_ids.tolist())
+    ).order_by(db_models.QuestionOption.id), 3)
+
+    # One row per completed attempt, answered or not, with the questions it
+    # drew; attempts from before draws were stored saw every mapped question
+    attempts = quiz_shard_session(db, quiz_id).execute(select(
+        db_models.QuizAttempt.id, db_models.QuizAttempt.question_ids,
+    ).where(
+        db_models.QuizAttempt.quiz_id == quiz_id,
+        db_models.QuizAttempt.status == "completed",
+    ).order_by(db_models.QuizAttempt.id)).all()
+    attempt_ids = np.array([attempt.id for attempt in attempts], dtype=np.int64)
+
+    # Responses come from the quiz's shard; questions and options from the catalog
+    responses = fetch_columns(quiz_shard_session(db, quiz_id), select(
+        db_models.QuizResponse.attempt_id,
+        db_models.QuizResponse.question_id,
+        func.coalesce(db_models.QuizResponse.selected_option_id, 0),
+        func.coalesce(db_models.QuizResponse.marks_obtained, 0),
+    ).join(
+        db_models.QuizAttempt, db_models.QuizAttempt.id == db_models.QuizResponse.attempt_id
+    ).where(
+        db_models.QuizAttempt.quiz_id == quiz_id,
+        db_models.QuizAttempt.status == "completed",
+    ), 4)
+    responses = np.concatenate([responses, packed_response_columns(db, quiz_id)])
+
+    # Drop responses to questions that are no longer mapped to the quiz, or
+    # of attempts that aren't completed
+    question_pos, mapped = _positions(question_ids, responses[:, 1])
+    attempt_pos, known = _positions(attempt_ids, responses[:, 0])
+    keep = mapped & known
+    responses = responses[keep]
+    question_index = question_pos[keep]
+    attempt_index = attempt_pos[keep]
+
+    # Which questions each attempt drew
+    drawn = np.ones((len(attempt_ids), len(question_ids)), dtype=bool)
+    stored = [(row, attempt.question_ids) for row, attempt in enumerate(attempts) if attempt.question_ids is not None]
+    if stored:
+        draws = [np.array(unpack_question_ids(packed), dtype=np.int64) for _, packed in stored]
+        rows = np.repeat([row for row, _ in stored], [len(draw) for draw in draws])
+        drawn_pos, drawn_mapped = _positions(question_ids, np.concatenate(draws))
+        drawn[[row for row, _ in stored]] = False
+        drawn[rows[drawn_mapped], drawn_pos[drawn_mapped]] = True
+    drawn[attempt_index, question_index] = True
+
+    # attempts x questions matrix of dichotomous (0/1) item scores; NaN where
+    # the attempt never saw the question, so it counts neither right nor wrong
+    matrix = np.where(drawn, 0.0, np.nan)
+    matrix[attempt_index, question_index] = responses[:, 3] > 0
+    totals = np.nansum(matrix, axis=1)
+
+    if len(attempt_ids):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            difficulty = _nan_to_none(np.nansum(matrix, axis=0) / drawn.sum(axis=0))
+        discrimination = _nan_to_none(_point_biserial(matrix, totals))
+    else:
+        difficulty = [None] * len(question_ids)
+        discrimination = [None] * len(question_ids)
+
+    # How often each option was picked, counted in one pass over all responses
+    option_ids = options[:, 0]
+    option_pos = np.searchsorted(option_ids, responses[:, 2])
+    option_pos = np.minimum(option_pos, max(len(option_ids) - 1, 0))
+    chosen = (
+        (option_ids[option_pos] == responses[:, 2])
+        if len(option_ids) else np.zeros(len(responses), dtype=bool)
+    )
+    option_counts = np.bincount(option_pos[chosen], minlength=len(option_ids))
+    answered = np.bincount(question_index, minlength=len(question_ids))
+
+    options_by_question = {}
+    for (option_id, question_id, is_correct), count in zip(options.tolist(), option_counts.tolist()):
+        options_by_question.setdefault(question_id, []).append((option_id, is_correct, count))
+
+    items = []
+    for idx, (question_id, question_number) in enumerate(questions.tolist()):
+        item_answered = int(answered[idx])
+        items.append({
+            "question_id": question_id,
+            "question_number": question_number,
+            "responses": item_answered,
+            "difficulty": difficulty[idx],
+            "discrimination": discrimination[idx],
+            "options": [
+                {
+                    "option_id": option_id,
+                    "is_correct": bool(is_correct),
+                    "count": count,
+                    "proportion": count / item_answered if item_answered else 0.0,
+                }
+                for option_id, is_correct, count in options_by_question.get(question_id, [])
+            ],
+        })
+
+    analytics = {
+        "quiz_id": quiz_id,
+        "attempts": int(len(attempt_ids)),
+        "mean_score": float(totals.mean()) if len(attempt_ids) else None,
+        "kr20": _kr20(matrix, totals),
+        "questions": items,
+    }
+    _analytics_cache[quiz_id] = (key, analytics)
+    return analytics
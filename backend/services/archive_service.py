@@ -0,0 +1,236 @@
+from datetime import datetime, timedelta
+import json
+import os
+import zlib
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+import database.db_models as db_models
+from database.db_connect import all_attempt_sessions, quiz_shard_session, remember_quiz_shard, shard_session
+from services.analytics_service import fetch_columns, get_quiz_item_analysis, invalidate_quiz_analytics
+from services.response_store import packed_response_columns
+
+# Quizzes are archived this many days after their window (and the submit
+# grace) has ended. Quizzes without a closes_at are never archived
+# automatically, however quiet they are.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+
+# Attempts started before closes_at may still be submitted for this long after
+# it; quizzes are only archived once it has passed
+SUBMIT_GRACE_SECONDS = int(os.getenv("SUBMIT_GRACE_SECONDS", "60"))
+
+
+def pack_responses(columns: np.ndarray) -> bytes:
+    # (question_id, selected_option_id, marks) rows stored column by column as
+    # little-endian int32 so runs of similar values compress well
+    return zlib.compress(np.ascontiguousarray(columns.T, dtype="<i4").tobytes(), 6)
+
+
+def unpack_responses(blob: bytes) -> np.ndarray:
+    return np.frombuffer(zlib.decompress(blob), dtype="<i4").reshape(3, -1).T
+
+
+def _archived_responses(archived: db_models.QuizAttemptArchive):
+    return [
+        {
+            "question_id": question_id,
+            "selected_option_id": selected_option_id,
+            "marks_obtained": marks,
+        }
+        for question_id, selected_option_id, marks in unpack_responses(archived.responses).tolist()
+    ]
+
+
+def archive_quiz(db: Session, quiz_id: int):
+    quiz = db.query(db_models.Quiz).filter(db_models.Quiz.id == quiz_id).first()
+    if not quiz:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+    if quiz.moving_since:
+        raise ValueError(f"Quiz {quiz_id} is being moved to another shard")
+    remember_quiz_shard(quiz_id, quiz.shard)
+    attempts_db = shard_session(db, quiz.shard)
+
+    # Attempts still in progress stay live and can be submitted; a later run
+    # archives them once they are completed
+    if quiz.archived_at is None:
+        archived_at = datetime.utcnow()
+        # Freeze the item analysis before the rows it is computed from go away
+        invalidate_quiz_analytics(quiz_id)
+        analytics = get_quiz_item_analysis(db, quiz_id)
+        invalidate_quiz_analytics(quiz_id)
+        db.merge(db_models.QuizArchiveStats(
+            quiz_id=quiz_id,
+            attempts=analytics["attempts"],
+            mean_score=analytics["mean_score"],
+            analytics=json.dumps(analytics),
+            archived_at=archived_at,
+        ))
+        quiz.archived_at = archived_at
+        if attempts_db is not db:
+            # Catalog first: if moving the attempts on the shard fails, they
+            # stay readable as live attempts and a rerun finishes the move
+            db.commit()
+    else:
+        archived_at = quiz.archived_at
+
+    attempts = attempts_db.execute(select(
+        db_models.QuizAttempt.id,
+        db_models.QuizAttempt.user_id,
+        db_models.QuizAttempt.start_time,
+        db_models.QuizAttempt.end_time,
+        db_models.QuizAttempt.score,
+        db_models.QuizAttempt.status,
+    ).where(
+        db_models.QuizAttempt.quiz_id == quiz_id,
+        db_models.QuizAttempt.status == "completed",
+    ).order_by(db_models.QuizAttempt.id)).all()
+
+    responses = fetch_columns(attempts_db, select(
+        db_models.QuizResponse.attempt_id,
+        db_models.QuizResponse.question_id,
+        func.coalesce(db_models.QuizResponse.selected_option_id, 0),
+        func.coalesce(db_models.QuizResponse.marks_obtained, 0),
+    ).join(
+        db_models.QuizAttempt, db_models.QuizAttempt.id == db_models.QuizResponse.attempt_id
+    ).where(
+        db_models.QuizAttempt.quiz_id == quiz_id,
+        db_models.QuizAttempt.status == "completed",
+    ).order_by(db_models.QuizResponse.attempt_id, db_models.QuizResponse.id), 4)
+    responses = np.concatenate([responses, packed_response_columns(db, quiz_id)])
+    responses = responses[np.argsort(responses[:, 0], kind="stable")]
+
+    # Responses are sorted by attempt, so each attempt owns one contiguous slice
+    attempt_ids = np.array([attempt.id for attempt in attempts], dtype=np.int64)
+    starts = np.searchsorted(responses[:, 0], attempt_ids, side="left")
+    ends = np.searchsorted(responses[:, 0], attempt_ids, side="right")
+
+    rows = []
+    for attempt, start, end in zip(attempts, starts.tolist(), ends.tolist()):
+        columns = responses[start:end, 1:]
+        rows.append({
+            "id": attempt.id,
+            "quiz_id": quiz_id,
+            "user_id": attempt.user_id,
+            "start_time": attempt.start_time,
+            "end_time": attempt.end_time,
+            "score": attempt.score,
+            "status": attempt.status,
+            "correct_answers": int((columns[:, 2] > 0).sum()),
+            "total_questions": int(len(columns)),
+            "responses": pack_responses(columns),
+            "archived_at": archived_at,
+        })
+
+    completed = select(db_models.QuizAttempt.id).where(
+        db_models.QuizAttempt.quiz_id == quiz_id,
+        db_models.QuizAttempt.status == "completed",
+    )
+    if rows:
+        attempts_db.execute(insert(db_models.QuizAttemptArchive), rows)
+    attempts_db.execute(delete(db_models.QuizResponse).where(db_models.QuizResponse.attempt_id.in_(completed)))
+    attempts_db.execute(delete(db_models.QuizAttempt).where(db_models.QuizAttempt.id.in_(completed)))
+    attempts_db.commit()
+    print(f"Archived {len(rows)} attempts of quiz {quiz_id}")
+    return len(rows)
+
+
+def archive_closed_quizzes(db: Session, older_than_days: int = ARCHIVE_AFTER_DAYS):
+    # Only quizzes that have closed: an untimed quiz going quiet is not a
+    # reason to stop taking attempts for good
+    closed_before = datetime.utcnow() - timedelta(days=older_than_days, seconds=SUBMIT_GRACE_SECONDS)
+    quiz_ids = list(db.execute(select(db_models.Quiz.id).where(
+        db_models.Quiz.archived_at.is_(None),
+        db_models.Quiz.moving_since.is_(None),
+        db_models.Quiz.closes_at < closed_before,
+    )).scalars())
+
+    # Archived quizzes whose attempts were still in progress back then and
+    # have been submitted since; they live on their quiz's shard
+    leftovers = set()
+    for attempts_db in all_attempt_sessions(db):
+        leftovers.update(attempts_db.execute(select(db_models.QuizAttempt.quiz_id).where(
+            db_models.QuizAttempt.status == "completed",
+        ).distinct()).scalars())
+    if leftovers:
+        quiz_ids += db.execute(select(db_models.Quiz.id).where(
+            db_models.Quiz.id.in_(leftovers),
+            db_models.Quiz.archived_at.isnot(None),
+            db_models.Quiz.moving_since.is_(None),
+        )).scalars().all()
+
+    archived = {}
+    for quiz_id in quiz_ids:
+        archived[quiz_id] = archive_quiz(db, quiz_id)
+    return archived
+
+
+def get_archived_attempts(db: Session, quiz_id: int):
+    archived = quiz_shard_session(db, quiz_id).query(db_models.QuizAttemptArchive).filter(
+        db_models.QuizAttemptArchive.quiz_id == quiz_id
+    ).all()
+    return [
+        {
+            "id": attempt.id,
+            "quiz_id": attempt.quiz_id,
+            "user_id": attempt.user_id,
+            "start_time": attempt.start_time,
+            "end_time": attempt.end_time,
+            "score": attempt.score,
+            "status": attempt.status,
+            "responses": _archived_responses(attempt),
+        }
+        for attempt in archived
+    ]
+
+
+def get_archived_user_response(db: Session, quiz_id: int, user_id: int):
+    attempt = quiz_shard_session(db, quiz_id).query(db_models.QuizAttemptArchive).filter(
+        db_models.QuizAttemptArchive.quiz_id == quiz_id,
+        db_models.QuizAttemptArchive.user_id == user_id
+    ).order_by(
+        db_models.QuizAttemptArchive.start_time.desc(), db_models.QuizAttemptArchive.id.desc()
+    ).first()
+
+    if not attempt:
+        return None
+
+    return {
+        "attempt_id": attempt.id,
+        "start_time": attempt.start_time,
+        "end_time": attempt.end_time,
+        "status": attempt.status,
+        "responses": [
+            {
+                "question_id": response["question_id"],
+                "selected_option_id": response["selected_option_id"],
+            }
+            for response in _archived_responses(attempt)
+        ]
+    }
+
+
+def get_archived_scores(db: Session, quiz_id: int):
+    # Counts were stored at archive time, so no blob needs decompressing here
+    attempts = quiz_shard_session(db, quiz_id).query(
+        db_models.QuizAttemptArchive.user_id,
+        db_models.QuizAttemptArchive.score,
+        db_models.QuizAttemptArchive.correct_answers,
+        db_models.QuizAttemptArchive.total_questions,
+        db_models.QuizAttemptArchive.end_time,
+    ).filter(
+        db_models.QuizAttemptArchive.quiz_id == quiz_id,
+        db_models.QuizAttemptArchive.end_time.isnot(None)
+    ).all()
+
+    return [
+        {
+            "user_id": attempt.user_id,
+            "score": attempt.score,
+            "correct_answers": attempt.correct_answers,
+            "total_questions": attempt.total_questions,
+            "completion_time": attempt.end_time.isoformat() if attempt.end_time else None
+        }
+        for attempt in attempts
+    ]
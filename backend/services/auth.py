@@ -2,23 +2,35 @@ from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from typing import Optional
 import os
-from jose import JWTError, jwt
+import uuid
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from database.db_connect import get_db
+from database.db_connect import SessionLocal, get_db
 import database.db_models as db_models
 
 # Get environment variables
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Build the signing key once instead of parsing the secret on every encode/decode
+_JWT_KEY = jwk.construct(SECRET_KEY, ALGORITHM) if SECRET_KEY and ALGORITHM else SECRET_KEY
+_JWT_ALGORITHMS = [ALGORITHM]
 
 # OAuth2 configuration
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
 
+# Built once; every request reuses the statement and its compiled SQL
+_user_by_username = select(db_models.User).where(db_models.User.username == bindparam("username"))
+
 # Password hashing configuration
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -29,8 +41,10 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 def authenticate_user(username: str, password: str):
-    db = next(get_db())
-    user = db.query(db_models.User).filter(db_models.User.username == username).first()
+    # Closed before the (slow) hash check so login never holds a pooled
+    # connection while bcrypt runs
+    with SessionLocal() as db:
+        user = db.execute(_user_by_username, {"username": username}).scalar_one_or_none()
     if not user:
         return False
     if not verify_password(password, user.hashed_password):
@@ -44,28 +58,72 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _JWT_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def create_refresh_token(username: str):
+    return create_access_token(
+        data={"sub": username, "type": "refresh", "jti": uuid.uuid4().hex},
+        expires_delta=timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+
+def decode_refresh_token(db: Session, token: str):
+    # Signature check plus a primary-key lookup in the revocation list; no
+    # password hashing and no user query
+    try:
+        payload = jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
+    except JWTError:
+        return None
+    if payload.get("type") != "refresh" or not payload.get("sub") or not payload.get("jti"):
+        return None
+    # Early reject only; revoke_refresh_token is what makes a token single use
+    if db.get(db_models.RevokedToken, payload["jti"]) is not None:
+        return None
+    return payload
+
+def revoke_refresh_token(db: Session, payload: dict):
+    # The insert is the check: of two concurrent revocations of one token only
+    # one commits, the other hits the primary key and gets False
+    now = datetime.utcnow()
+    # Entries are only needed until the token would have expired anyway
+    db.query(db_models.RevokedToken).filter(db_models.RevokedToken.expires_at < now).delete()
+    db.add(db_models.RevokedToken(
+        jti=payload["jti"],
+        expires_at=datetime.utcfromtimestamp(payload["exp"]),
+        revoked_at=now
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+def user_from_token(db: Session, token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
+        # Refresh tokens can only be exchanged for access tokens
+        if payload.get("type") == "refresh":
+            raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(db_models.User).filter(db_models.User.username == username).first()
+    user = db.execute(_user_by_username, {"username": username}).scalar_one_or_none()
     if user is None:
         raise credentials_exception
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    return user_from_token(db, token)
+
 async def get_current_admin(current_user: db_models.User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(
@@ -0,0 +1,183 @@
+import gzip
+import os
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+import services.metrics as metrics
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this are sent as-is; headers would eat most of the gain
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Per-request compression trades ratio for latency; bodies compressed once and
+# cached can afford the slowest settings
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+
+# Preferred first when the client weights them equally
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+
+
+def choose_encoding(accept_encoding: str):
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    # Counts the CPU time spent so the metrics can weigh it against bytes saved
+    started = time.thread_time()
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=PRECOMPRESS_GZIP_LEVEL if precompress else GZIP_LEVEL, mtime=0)
+    metrics.incr(f"compression.{encoding}.cpu_seconds", time.thread_time() - started)
+    return compressed
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._process, self._finish = self._compressor.process, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+            self._process, self._finish = self._compressor.compress, self._compressor.flush
+
+    def process(self, chunk: bytes, last: bool) -> bytes:
+        started = time.thread_time()
+        compressed = self._process(chunk)
+        if last:
+            compressed += self._finish()
+        metrics.incr(f"compression.{self.encoding}.cpu_seconds", time.thread_time() - started)
+        return compressed
+
+
+def _record_sent(encoding: str, original: int, sent: int):
+    metrics.incr(f"compression.{encoding}.responses")
+    metrics.incr(f"compression.{encoding}.bytes_in", original)
+    metrics.incr(f"compression.{encoding}.bytes_out", sent)
+    metrics.incr("compression.bytes_saved", original - sent)
+
+
+class EncodedBody:
+    # A response body together with its compressed forms, built once and kept
+    # next to cached payloads so they are never recompressed per request
+    def __init__(self, body: bytes, media_type: str = "application/json", encoded: dict | None = None):
+        self.body = body
+        self.media_type = media_type
+        self.encoded = {}
+        if encoded is not None:
+            self.encoded = encoded
+        elif len(body) >= COMPRESSION_MIN_BYTES:
+            for encoding in ENCODINGS:
+                self.encoded[encoding] = compress(body, encoding, precompress=True)
+
+    def response(self, accept_encoding: str) -> Response:
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = choose_encoding(accept_encoding)
+        if encoding in self.encoded:
+            body = self.encoded[encoding]
+            headers["Content-Encoding"] = encoding
+            metrics.incr(f"compression.{encoding}.precompressed_hits")
+            _record_sent(encoding, len(self.body), len(body))
+        else:
+            body = self.body
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+class CompressionMiddleware:
+    # gzip/brotli for JSON/text responses above COMPRESSION_MIN_BYTES.
+    # Responses that arrive in chunks (e.g. through other middleware) are
+    # compressed as a stream; event streams and bodies that already carry a
+    # Content-Encoding pass through untouched.
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+        bytes_in = bytes_out = 0
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough, bytes_in, bytes_out
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(scope=start_message)
+                length = headers.get("content-length")
+                size = int(length) if length is not None else (None if more_body else len(body))
+                if (
+                    "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                    or (size is not None and size < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _StreamCompressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    compressed = compressor.process(body, last=True)
+                    headers["Content-Length"] = str(len(compressed))
+                    _record_sent(encoding, len(body), len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send(start_message)
+
+            compressed = compressor.process(body, last=not more_body)
+            bytes_in += len(body)
+            bytes_out += len(compressed)
+            if not more_body:
+                _record_sent(encoding, bytes_in, bytes_out)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
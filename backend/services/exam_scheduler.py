@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import database.db_models as db_models
+import services.auth as auth
+import services.quiz_service as quiz_service
+import services.quiz_snapshot as quiz_snapshot
+from database.db_connect import SessionLocal, quiz_shard_session, warm_pool
+
+# Scheduled quizzes are warmed this long before opens_at
+PREWARM_MINUTES = float(os.getenv("PREWARM_MINUTES", "5"))
+
+# How often each worker looks for quizzes about to open
+SCHEDULER_INTERVAL_SECONDS = float(os.getenv("SCHEDULER_INTERVAL_SECONDS", "30"))
+
+SCHEDULER_ENABLED = os.getenv("EXAM_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# (quiz_id, opens_at) already warmed by this worker
+_warmed = set()
+
+
+def prewarm_quiz(db: Session, quiz_id: int):
+    # Everything the first requests of an exam would otherwise build at once:
+    # the payload and its compressed body, the answer key, the compiled
+    # statements of the start/submit/auth path and pool connections
+    quiz = db.get(db_models.Quiz, quiz_id)
+    if quiz is None:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+    if quiz.published_at is not None and quiz_snapshot.get_snapshot(quiz_id) is None:
+        quiz_service.write_quiz_snapshot(db, quiz_id)
+    payload = quiz_service.get_cached_quiz(db, quiz_id)
+    quiz_service.get_cached_quiz_body(db, quiz_id, precompress_now=True)
+    quiz_service.get_grader(db, quiz_id, payload["content_version"])
+
+    # There is no enrolment list to prefetch, so warm the per-request lookups
+    # every student will hit instead
+    attempts_db = quiz_shard_session(db, quiz_id)
+    db.execute(auth._user_by_username, {"username": ""}).all()
+    attempts_db.execute(quiz_service._in_progress_attempt_stmt, {"quiz_id": quiz_id, "user_id": 0}).all()
+    db.execute(quiz_service._quiz_availability_stmt, {"quiz_id": quiz_id}).all()
+    db.execute(quiz_service._content_version_stmt, {"quiz_id": quiz_id}).all()
+    attempts_db.rollback()
+    db.rollback()
+
+    connections = warm_pool()
+    print(f"Pre-warmed quiz {quiz_id} ({len(payload['questions'])} questions, {connections} pooled connections)")
+    return connections
+
+
+def run_due_prewarms(db: Session, now: datetime | None = None):
+    now = now or datetime.utcnow()
+    due = db.execute(select(db_models.Quiz.id, db_models.Quiz.opens_at).where(
+        db_models.Quiz.archived_at.is_(None),
+        db_models.Quiz.opens_at > now,
+        db_models.Quiz.opens_at <= now + timedelta(minutes=PREWARM_MINUTES),
+    )).all()
+    warmed = []
+    for quiz_id, opens_at in due:
+        if (quiz_id, opens_at) in _warmed:
+            continue
+        try:
+            prewarm_quiz(db, quiz_id)
+        except ValueError as e:
+            # e.g. no questions mapped yet; retried on the next tick
+            print(f"Could not pre-warm quiz {quiz_id}: {e}")
+            continue
+        _warmed.add((quiz_id, opens_at))
+        warmed.append(quiz_id)
+    return warmed
+
+
+def _tick():
+    db = SessionLocal()
+    try:
+        return run_due_prewarms(db)
+    finally:
+        db.close()
+
+
+async def run_scheduler():
+    while True:
+        try:
+            await asyncio.to_thread(_tick)
+        except Exception as e:
+            print(f"Exam scheduler error: {e}")
+        await asyncio.sleep(SCHEDULER_INTERVAL_SECONDS)
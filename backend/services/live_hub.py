@@ -0,0 +1,98 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+
+# Frames buffered per viewer before it is considered too slow to keep up
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+
+# When > 0, events are merged per quiz and flushed as one diff at this interval
+LIVE_COALESCE_SECONDS = float(os.getenv("LIVE_COALESCE_SECONDS", "0"))
+
+# Idle streams get a comment line this often so dead connections are noticed
+LIVE_KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_event(event_type: str, data) -> bytes:
+    payload = json.dumps(data, default=_json_default, separators=(",", ":"))
+    return f"event: {event_type}\ndata: {payload}\n\n".encode()
+
+
+# Fans quiz events out to every live viewer of that quiz in this process.
+# Each event is encoded once and the same bytes are queued for all viewers; a
+# viewer whose queue fills up has its backlog replaced by a single "resync"
+# frame telling it to reload the scoreboard, so it never slows anyone else down.
+class QuizEventHub:
+    def __init__(self, queue_size: int = LIVE_QUEUE_SIZE, coalesce_seconds: float = LIVE_COALESCE_SECONDS):
+        self.queue_size = queue_size
+        self.coalesce_seconds = coalesce_seconds
+        self._subscribers = {}  # quiz_id -> set of asyncio.Queue
+        self._pending = {}      # quiz_id -> {(event_type, user_id): data} waiting for the next flush
+        self._loop = None
+
+    def subscriber_count(self, quiz_id: int) -> int:
+        return len(self._subscribers.get(quiz_id, ()))
+
+    def publish(self, quiz_id: int, event_type: str, data: dict):
+        # Safe to call from request threads; the work happens on the event loop
+        if self._loop is None or not self._subscribers.get(quiz_id):
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, quiz_id, event_type, data)
+
+    def _dispatch(self, quiz_id: int, event_type: str, data: dict):
+        if not self.coalesce_seconds:
+            self._broadcast(quiz_id, encode_event(event_type, data))
+            return
+        pending = self._pending.get(quiz_id)
+        if pending is None:
+            pending = self._pending[quiz_id] = {}
+            self._loop.call_later(self.coalesce_seconds, self._flush, quiz_id)
+        # Later events for the same user supersede earlier ones within a window
+        pending[(event_type, data.get("user_id"))] = data
+
+    def _flush(self, quiz_id: int):
+        pending = self._pending.pop(quiz_id, None)
+        if not pending:
+            return
+        diff = {}
+        for (event_type, _), data in pending.items():
+            diff.setdefault(event_type, []).append(data)
+        self._broadcast(quiz_id, encode_event("batch", diff))
+
+    def _broadcast(self, quiz_id: int, frame: bytes):
+        for queue in self._subscribers.get(quiz_id, ()):
+            if queue.full():
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(encode_event("resync", {"quiz_id": quiz_id}))
+            else:
+                queue.put_nowait(frame)
+
+    async def stream(self, quiz_id: int):
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(quiz_id, set()).add(queue)
+        try:
+            yield encode_event("subscribed", {"quiz_id": quiz_id})
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), LIVE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_FRAME
+        finally:
+            subscribers = self._subscribers.get(quiz_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[quiz_id]
+
+
+hub = QuizEventHub()
@@ -0,0 +1,34 @@
+import threading
+
+# Process-wide counters and gauges, read by GET /api/metrics. Counters only
+# ever grow; gauges are callables sampled when a snapshot is taken.
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+
+
+def incr(name: str, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def get(name: str):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def register_gauge(name: str, read):
+    _gauges[name] = read
+
+
+def snapshot():
+    with _lock:
+        values = dict(_counters)
+    for name, read in list(_gauges.items()):
+        values[name] = read()
+    return dict(sorted(values.items()))
+
+
+def reset():
+    with _lock:
+        _counters.clear()
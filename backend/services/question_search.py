@@ -0,0 +1,128 @@
+import base64
+import json
+import re
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# SQLite: external-content FTS5 table kept in sync with questions by triggers
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5("
+    "question_text, content='questions', content_rowid='id', tokenize='unicode61', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN "
+    "INSERT INTO questions_fts(rowid, question_text) VALUES (new.id, new.question_text); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, question_text) VALUES ('delete', old.id, old.question_text); END",
+    "CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE OF question_text ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, question_text) VALUES ('delete', old.id, old.question_text); "
+    "INSERT INTO questions_fts(rowid, question_text) VALUES (new.id, new.question_text); END",
+]
+
+# PostgreSQL: generated tsvector column (maintained on every insert/update) with a GIN index
+POSTGRESQL_SEARCH_DDL = [
+    "ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', coalesce(question_text, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_questions_search_vector ON questions USING GIN (search_vector)",
+]
+
+MAX_PAGE_SIZE = 100
+
+
+def ensure_search_index(engine):
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            for statement in SQLITE_SEARCH_DDL:
+                conn.execute(text(statement))
+            indexed = conn.execute(text("SELECT count(*) FROM questions_fts_docsize")).scalar()
+            total = conn.execute(text("SELECT count(*) FROM questions")).scalar()
+            if indexed != total:
+                # Questions inserted before the index existed
+                conn.execute(text("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            for statement in POSTGRESQL_SEARCH_DDL:
+                conn.execute(text(statement))
+
+
+def encode_cursor(rank: float, question_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, question_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        rank, question_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(question_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _terms(query: str):
+    return re.findall(r"\w+", query.lower())
+
+
+def search_questions(db: Session, query: str, limit: int = 20, cursor: str | None = None):
+    terms = _terms(query)
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    after_rank, after_id = decode_cursor(cursor) if cursor else (None, None)
+
+    # Every dialect yields (id, question_text, rank) of current question
+    # versions, ordered by (rank, id) ascending so pages can continue from the
+    # last (rank, id) seen
+    dialect = db.get_bind().dialect.name
+    params = {"limit": limit + 1}
+    keyset = ""
+    if cursor:
+        params.update(after_rank=after_rank, after_id=after_id)
+        keyset = "WHERE rank > :after_rank OR (rank = :after_rank AND id > :after_id)"
+    if dialect == "sqlite":
+        # Every term is a prefix match; bm25 is lower-is-better already
+        params["match"] = " ".join(f'"{term}"*' for term in terms)
+        sql = f"""
+            SELECT id, question_text, rank FROM (
+                SELECT questions.id AS id, questions.question_text AS question_text,
+                       bm25(questions_fts) AS rank
+                FROM questions_fts JOIN questions ON questions.id = questions_fts.rowid
+                WHERE questions_fts MATCH :match AND questions.is_current
+            ) AS hits
+            {keyset}
+            ORDER BY rank, id
+            LIMIT :limit
+        """
+    elif dialect == "postgresql":
+        params["tsquery"] = " & ".join(f"{term}:*" for term in terms)
+        sql = f"""
+            SELECT id, question_text, rank FROM (
+                SELECT id, question_text,
+                       -ts_rank(search_vector, to_tsquery('english', :tsquery))::float8 AS rank
+                FROM questions
+                WHERE search_vector @@ to_tsquery('english', :tsquery) AND is_current
+            ) AS hits
+            {keyset}
+            ORDER BY rank, id
+            LIMIT :limit
+        """
+    else:
+        # No text index on other backends: unranked substring match
+        for idx, term in enumerate(terms):
+            params[f"term{idx}"] = f"%{term}%"
+        where = " AND ".join(f"lower(question_text) LIKE :term{idx}" for idx in range(len(terms)))
+        sql = f"""
+            SELECT id, question_text, rank FROM (
+                SELECT id, question_text, 0.0 AS rank FROM questions WHERE {where} AND is_current
+            ) AS hits
+            {keyset}
+            ORDER BY rank, id
+            LIMIT :limit
+        """
+
+    rows = db.execute(text(sql), params).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [
+            {"id": row.id, "question_text": row.question_text, "rank": float(row.rank)}
+            for row in rows
+        ],
+        "next_cursor": encode_cursor(float(rows[-1].rank), rows[-1].id) if has_more else None,
+    }
@@ -0,0 +1,93 @@
+from sqlalchemy.orm import Session
+
+import database.db_models as db_models
+import models.schemas as schemas
+
+
+def _can_manage(question: db_models.Question, user: db_models.User) -> bool:
+    # Admins and the author see the answer key and may publish new versions
+    return user.is_admin or (question.creator_id is not None and question.creator_id == user.id)
+
+
+def _question_dict(question: db_models.Question, with_answers: bool = True):
+    return {
+        "id": question.id,
+        "question_text": question.question_text,
+        "lineage_id": question.lineage_id or question.id,
+        "version": question.version,
+        "is_current": question.is_current,
+        "options": [
+            {"id": option.id, "option_text": option.option, "is_correct": option.is_correct if with_answers else None}
+            for option in sorted(question.options, key=lambda option: option.id)
+        ],
+    }
+
+
+def _add_options(db: Session, question: db_models.Question, options):
+    for option in options:
+        db.add(db_models.QuestionOption(
+            question_id=question.id,
+            option=option.option_text,
+            is_correct=option.is_correct,
+        ))
+
+
+def get_question(db: Session, question_id: int, user: db_models.User):
+    question = db.get(db_models.Question, question_id)
+    if not question:
+        raise ValueError(f"Question with ID {question_id} not found")
+    return _question_dict(question, with_answers=_can_manage(question, user))
+
+
+def create_question(db: Session, question: schemas.QuestionCreate, creator_id: int):
+    db_question = db_models.Question(
+        question_text=question.question_text, version=1, is_current=True, creator_id=creator_id,
+    )
+    db.add(db_question)
+    db.flush()
+    _add_options(db, db_question, question.options)
+    db.commit()
+    db.refresh(db_question)
+    return _question_dict(db_question)
+
+
+def create_question_version(db: Session, question_id: int, question: schemas.QuestionCreate, user: db_models.User):
+    # Copy-on-write: the edited row stays untouched for the quizzes and attempts
+    # that reference it, and the edit becomes the lineage's new current version
+    current = db.query(db_models.Question).filter(
+        db_models.Question.id == question_id
+    ).with_for_update().first()
+    if not current:
+        raise ValueError(f"Question with ID {question_id} not found")
+    if not _can_manage(current, user):
+        raise ValueError(f"Not allowed to edit question {question_id}")
+    if not current.is_current:
+        raise ValueError(f"Question {question_id} has been superseded by a newer version")
+
+    db_question = db_models.Question(
+        question_text=question.question_text,
+        lineage_id=current.lineage_id or current.id,
+        version=current.version + 1,
+        is_current=True,
+        creator_id=current.creator_id,
+    )
+    db.add(db_question)
+    current.is_current = False
+    db.flush()
+    _add_options(db, db_question, question.options)
+    db.commit()
+    db.refresh(db_question)
+    return _question_dict(db_question)
+
+
+def get_question_versions(db: Session, question_id: int, user: db_models.User):
+    question = db.get(db_models.Question, question_id)
+    if not question:
+        raise ValueError(f"Question with ID {question_id} not found")
+    if not _can_manage(question, user):
+        raise ValueError(f"Not allowed to view the versions of question {question_id}")
+    lineage_id = question.lineage_id or question.id
+    versions = db.query(db_models.Question).filter(
+        (db_models.Question.id == lineage_id) | (db_models.Question.lineage_id == lineage_id)
+    ).order_by(db_models.Question.version).all()
+    return [_question_dict(version) for version in versions]
@@ -1,9 +1,141 @@
-from datetime import datetime
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, text
+import base64
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+import random
+import secrets
+import threading
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session, joinedload, noload
+from sqlalchemy import bindparam, case, delete, func, insert, literal, select, text, tuple_, union_all, update
 
 import database.db_models as db_models
 import models.schemas as schemas
+from database.db_connect import (
+    all_attempt_sessions,
+    assign_shard,
+    next_attempt_id,
+    quiz_shard_session,
+    remember_quiz_shard,
+    shard_session,
+)
+import services.archive_service as archive_service
+import services.compression as compression
+import services.live_hub as live_hub
+import services.quiz_snapshot as quiz_snapshot
+import services.response_store as response_store
+from services.analytics_service import invalidate_quiz_analytics
+
+# Questions are immutable and every remap produces a new quiz content version,
+# so entries keyed by content version never go stale and are never invalidated;
+# the caches are only bounded so old versions eventually fall out
+CONTENT_CACHE_SIZE = 512
+
+HISTORY_MAX_PAGE_SIZE = 100
+
+# Hot-path statements are built once at import: requests only bind parameters,
+# so SQLAlchemy skips query construction and reuses the compiled SQL
+_content_version_stmt = select(db_models.Quiz.content_version).where(db_models.Quiz.id == bindparam("quiz_id"))
+
+_quiz_with_questions_stmt = select(db_models.Quiz).where(
+    db_models.Quiz.id == bindparam("quiz_id")
+).options(
+    joinedload(db_models.Quiz.questions)
+    .joinedload(db_models.QuizQuestion.question)
+    .joinedload(db_models.Question.options)
+)
+
+_quiz_availability_stmt = select(
+    db_models.Quiz.archived_at, db_models.Quiz.opens_at, db_models.Quiz.closes_at,
+    db_models.Quiz.shard, db_models.Quiz.moving_since,
+).where(db_models.Quiz.id == bindparam("quiz_id"))
+
+_quiz_visibility_stmt = select(db_models.Quiz.creator_id, db_models.Quiz.opens_at).where(
+    db_models.Quiz.id == bindparam("quiz_id")
+)
+
+_in_progress_attempt_stmt = select(db_models.QuizAttempt).where(
+    db_models.QuizAttempt.quiz_id == bindparam("quiz_id"),
+    db_models.QuizAttempt.user_id == bindparam("user_id"),
+    db_models.QuizAttempt.status == "in_progress",
+).order_by(db_models.QuizAttempt.start_time.desc()).limit(1)
+
+_completed_attempts_stmt = select(db_models.QuizAttempt).where(
+    db_models.QuizAttempt.quiz_id == bindparam("quiz_id"),
+    db_models.QuizAttempt.end_time.isnot(None),
+)
+
+# (attempt_id, correct, total) for every completed row-stored attempt of a quiz
+_response_counts_stmt = select(
+    db_models.QuizResponse.attempt_id,
+    func.sum(case((db_models.QuizResponse.marks_obtained > 0, 1), else_=0)),
+    func.count(db_models.QuizResponse.id),
+).join(
+    db_models.QuizAttempt, db_models.QuizAttempt.id == db_models.QuizResponse.attempt_id
+).where(
+    db_models.QuizAttempt.quiz_id == bindparam("quiz_id"),
+    db_models.QuizAttempt.end_time.isnot(None),
+).group_by(db_models.QuizResponse.attempt_id)
+
+class QuizMovingError(Exception):
+    # The quiz's attempts are being copied to another shard; writes resume
+    # within seconds
+    pass
+
+# content_version -> canonical (unshuffled) quiz payload shared by every attempt
+_quiz_payload_cache = OrderedDict()
+
+# content_version -> {question_id: set of correct option ids}
+_answer_key_cache = OrderedDict()
+
+# content_version -> serialized payload plus its gzip/brotli forms
+_quiz_body_cache = OrderedDict()
+
+# Threadpool endpoints and the exam scheduler share the caches above
+_cache_lock = threading.Lock()
+
+# Maximum-quality compression of a large quiz takes long enough to stall the
+# event loop, so cache misses precompress here, one body at a time
+_precompress_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precompress")
+_precompressing = set()  # content versions queued on _precompress_pool
+
+def _cache_get(cache: OrderedDict, key):
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+def _cache_put(cache: OrderedDict, key, value):
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > CONTENT_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def compute_content_version(quiz: db_models.Quiz, mappings):
+    # mappings: iterable of (question_id, question_number, marks); question ids
+    # pin immutable question versions, so this hash identifies the full content
+    content = [
+        quiz.id, quiz.title, quiz.duration, quiz.total_questions, quiz.total_score,
+        quiz.questions_per_attempt, sorted(tuple(mapping) for mapping in mappings)
+    ]
+    return hashlib.sha1(json.dumps(content).encode()).hexdigest()[:16]
+
+def get_content_version(db: Session, quiz_id: int):
+    version = db.execute(_content_version_stmt, {"quiz_id": quiz_id}).first()
+    if not version:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+    if version.content_version:
+        return version.content_version
+    # Quizzes mapped before content versions existed
+    quiz = db.get(db_models.Quiz, quiz_id)
+    mappings = db.query(
+        db_models.QuizQuestion.question_id, db_models.QuizQuestion.question_number, db_models.QuizQuestion.marks
+    ).filter(db_models.QuizQuestion.quiz_id == quiz_id).all()
+    return compute_content_version(quiz, mappings)
 
 def get_all_quizzes(db: Session):
     quizzes = db.query(db_models.Quiz).options(
@@ -36,13 +168,7 @@ def get_quiz_by_id(db: Session, quiz_id: int):
             print(f"Database connection test failed: {str(conn_err)}")
             raise ValueError(f"Database connection error: {str(conn_err)}")
 
-        quiz = db.query(db_models.Quiz).filter(
-            db_models.Quiz.id == quiz_id
-        ).options(
-            joinedload(db_models.Quiz.questions)
-            .joinedload(db_models.QuizQuestion.question)
-            .joinedload(db_models.Question.options)
-        ).first()
+        quiz = db.execute(_quiz_with_questions_stmt, {"quiz_id": quiz_id}).unique().scalar_one_or_none()
         print("Database query completed successfully")
     except ValueError:
         raise
@@ -70,6 +196,8 @@ def get_quiz_by_id(db: Session, quiz_id: int):
         "total_score": getattr(quiz, 'total_score', 0),
         "creator_id": getattr(quiz, 'creator_id', None),
         "created_at": getattr(quiz, 'created_at', datetime.utcnow()),
+        "questions_per_attempt": getattr(quiz, 'questions_per_attempt', None),
+        "content_version": getattr(quiz, 'content_version', None),
         "questions": []
     }
 
@@ -140,119 +268,493 @@ def get_quiz_by_id(db: Session, quiz_id: int):
     print(f"Successfully transformed quiz data for ID {quiz_id}")
     return transformed_quiz
 
+def get_cached_quiz(db: Session, quiz_id: int):
+    # Published quizzes come from the shared snapshot without touching the DB
+    snapshot = quiz_snapshot.get_snapshot(quiz_id)
+    if snapshot is not None:
+        return snapshot.payload()
+    # The canonical payload is identical for every viewer, so build it once per
+    # content version and let callers permute a copy per attempt
+    version = get_content_version(db, quiz_id)
+    quiz = _cache_get(_quiz_payload_cache, version)
+    if quiz is None:
+        quiz = get_quiz_by_id(db, quiz_id)
+        # The payload was read after the version lookup; file it under the
+        # version it was actually built from
+        quiz["content_version"] = quiz["content_version"] or version
+        _cache_put(_quiz_payload_cache, quiz["content_version"], quiz)
+    return quiz
+
+def _precompress(version: str, raw: bytes):
+    try:
+        _cache_put(_quiz_body_cache, version, compression.EncodedBody(raw))
+    except Exception as e:
+        print(f"Error precompressing quiz body {version}: {str(e)}")
+    finally:
+        with _cache_lock:
+            _precompressing.discard(version)
+
+def _precompress_later(version: str, raw: bytes):
+    with _cache_lock:
+        if version in _precompressing:
+            return
+        _precompressing.add(version)
+    _precompress_pool.submit(_precompress, version, raw)
+
+def get_cached_quiz_body(db: Session, quiz_id: int, precompress_now: bool = False):
+    # Serialized and compressed once per content version, so repeat viewers of
+    # an unchanged quiz cost neither JSON encoding nor compression
+    snapshot = quiz_snapshot.get_snapshot(quiz_id)
+    if snapshot is not None:
+        return snapshot.encoded_body()
+    version = get_content_version(db, quiz_id)
+    body = _cache_get(_quiz_body_cache, version)
+    if body is None:
+        quiz = get_cached_quiz(db, quiz_id)
+        raw = json.dumps(jsonable_encoder(quiz), separators=(",", ":")).encode()
+        if precompress_now or len(raw) < compression.COMPRESSION_MIN_BYTES:
+            body = compression.EncodedBody(raw)
+            _cache_put(_quiz_body_cache, quiz["content_version"], body)
+        else:
+            # Plain body (compressed per request by the middleware) until the
+            # precompressed forms replace it
+            body = compression.EncodedBody(raw, encoded={})
+            _cache_put(_quiz_body_cache, quiz["content_version"], body)
+            _precompress_later(quiz["content_version"], raw)
+    return body
+
+def get_answer_key(db: Session, quiz_id: int, content_version: str | None = None):
+    version = content_version or get_content_version(db, quiz_id)
+    answer_key = _cache_get(_answer_key_cache, version)
+    if answer_key is None:
+        rows = db.query(db_models.QuestionOption.question_id, db_models.QuestionOption.id).join(
+            db_models.QuizQuestion, db_models.QuizQuestion.question_id == db_models.QuestionOption.question_id
+        ).filter(
+            db_models.QuizQuestion.quiz_id == quiz_id,
+            db_models.QuestionOption.is_correct.is_(True)
+        ).all()
+        answer_key = {}
+        for question_id, option_id in rows:
+            answer_key.setdefault(question_id, set()).add(option_id)
+        _cache_put(_answer_key_cache, version, answer_key)
+    return answer_key
+
+def _question_answer_key(db: Session, question_ids):
+    rows = db.execute(select(db_models.QuestionOption.question_id, db_models.QuestionOption.id).where(
+        db_models.QuestionOption.question_id.in_(question_ids),
+        db_models.QuestionOption.is_correct.is_(True),
+    )).all()
+    answer_key = {}
+    for question_id, option_id in rows:
+        answer_key.setdefault(question_id, set()).add(option_id)
+    return answer_key
+
+def get_grader(db: Session, quiz_id: int, content_version: str, question_ids=None):
+    # (question_id, option_id) -> bool, answered from the shared snapshot when
+    # it holds this content version
+    snapshot = quiz_snapshot.get_snapshot(quiz_id)
+    if snapshot is not None and snapshot.content_version == content_version:
+        return snapshot.is_correct
+    if question_ids is not None and content_version != get_content_version(db, quiz_id):
+        # Remapped since the attempt started. Questions are immutable, so its
+        # own questions still carry the key it was shown.
+        answer_key = _question_answer_key(db, question_ids)
+    else:
+        answer_key = get_answer_key(db, quiz_id, content_version)
+    return lambda question_id, option_id: option_id in answer_key.get(question_id, ())
+
+def write_quiz_snapshot(db: Session, quiz_id: int):
+    quiz = get_quiz_by_id(db, quiz_id)
+    version = quiz["content_version"] or get_content_version(db, quiz_id)
+    quiz["content_version"] = version
+    quiz_snapshot.write_snapshot(quiz_id, version, quiz, get_answer_key(db, quiz_id, version))
+    return version
+
+def publish_quiz(db: Session, quiz_id: int):
+    quiz = db.query(db_models.Quiz).options(
+        noload(db_models.Quiz.questions)
+    ).filter(db_models.Quiz.id == quiz_id).first()
+    if not quiz:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+    # Snapshot first: a quiz that cannot be built (no questions) stays unpublished
+    version = write_quiz_snapshot(db, quiz_id)
+    if quiz.published_at is None:
+        quiz.published_at = datetime.utcnow()
+        try:
+            db.commit()
+        except Exception:
+            quiz_snapshot.delete_snapshot(quiz_id)
+            raise
+    return {"quiz_id": quiz_id, "content_version": version, "published_at": quiz.published_at}
+
+def refresh_quiz_snapshots(db: Session):
+    # Bring the snapshot directory in line with the database: rewrite missing
+    # or outdated snapshots of published quizzes and drop all others
+    published = dict(db.execute(select(db_models.Quiz.id, db_models.Quiz.content_version).where(
+        db_models.Quiz.published_at.isnot(None)
+    )).all())
+    for quiz_id in quiz_snapshot.snapshot_quiz_ids():
+        if quiz_id not in published:
+            quiz_snapshot.delete_snapshot(quiz_id)
+    written = 0
+    for quiz_id, version in published.items():
+        snapshot = quiz_snapshot.get_snapshot(quiz_id)
+        if snapshot is None or snapshot.content_version != version:
+            try:
+                write_quiz_snapshot(db, quiz_id)
+                written += 1
+            except ValueError as e:
+                print(f"Skipping snapshot of quiz {quiz_id}: {e}")
+    return written
+
+def attempt_question_ids(quiz: dict, seed: int | None):
+    # Question ids drawn for an attempt, in canonical order
+    question_ids = [question["id"] for question in quiz["questions"]]
+    pool_size = quiz.get("questions_per_attempt")
+    if seed is None or not pool_size or pool_size >= len(question_ids):
+        return question_ids
+    drawn = set(random.Random(seed).sample(question_ids, pool_size))
+    return [question_id for question_id in question_ids if question_id in drawn]
+
+def shuffle_quiz(quiz: dict, seed: int | None):
+    if seed is None:
+        return quiz
+
+    questions_by_id = {question["id"]: question for question in quiz["questions"]}
+    selected = [questions_by_id[question_id] for question_id in attempt_question_ids(quiz, seed)]
+
+    # Offset the seed so the ordering stream is independent of the pool draw
+    rng = random.Random(seed + 1)
+    rng.shuffle(selected)
+    questions = []
+    for question in selected:
+        options = list(question["options"])
+        rng.shuffle(options)
+        questions.append({**question, "options": options})
+
+    return {
+        **quiz,
+        "total_questions": len(questions),
+        "total_score": sum(question["marks"] for question in questions),
+        "questions": questions,
+    }
+
+def _utc_naive(value: datetime | None):
+    # Stored like the other timestamps: naive UTC
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def check_quiz_window(opens_at: datetime | None, closes_at: datetime | None, now: datetime | None = None, grace_seconds: int = 0):
+    now = now or datetime.utcnow()
+    if opens_at is not None and now < opens_at:
+        raise ValueError(f"Quiz opens at {opens_at.isoformat()}Z")
+    if closes_at is not None and now > closes_at + timedelta(seconds=grace_seconds):
+        raise ValueError(f"Quiz closed at {closes_at.isoformat()}Z")
+
+def check_quiz_visible(db: Session, quiz_id: int, user: db_models.User):
+    # Questions stay hidden until the quiz opens, except from admins and its creator
+    if user.is_admin:
+        return
+    quiz = db.execute(_quiz_visibility_stmt, {"quiz_id": quiz_id}).first()
+    if quiz is None:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+    if quiz.creator_id != user.id:
+        check_quiz_window(quiz.opens_at, None)
+
+def check_quiz_owner(db: Session, quiz_id: int, user: db_models.User):
+    # Views that reveal the answer key: admins and the quiz's creator only
+    if user.is_admin:
+        return
+    quiz = db.execute(_quiz_visibility_stmt, {"quiz_id": quiz_id}).first()
+    if quiz is None:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+    if quiz.creator_id != user.id:
+        raise ValueError(f"Only the creator of quiz {quiz_id} may view this")
+
 def create_quiz(db: Session, quiz: schemas.QuizCreate, creator_id: int):
+    opens_at, closes_at = _utc_naive(quiz.opens_at), _utc_naive(quiz.closes_at)
+    if opens_at is not None and closes_at is not None and closes_at <= opens_at:
+        raise ValueError("closes_at must be after opens_at")
     db_quiz = db_models.Quiz(
         title=quiz.title,
         creator_id=creator_id,
         total_questions=quiz.total_questions,
         total_score=quiz.total_score,
         duration=quiz.duration,
+        questions_per_attempt=quiz.questions_per_attempt,
+        opens_at=opens_at,
+        closes_at=closes_at,
     )
     db.add(db_quiz)
+    db.flush()
+    db_quiz.content_version = compute_content_version(db_quiz, [])
+    db_quiz.shard = assign_shard(db_quiz.id)
     db.commit()
     db.refresh(db_quiz)
     return db_quiz
 
 def map_quiz_questions(db: Session, quiz_id: int, question_map: schemas.QuizQuestionMap):
-    # First remove any existing mappings
-    db.query(db_models.QuizQuestion).filter(db_models.QuizQuestion.quiz_id == quiz_id).delete()
-    db.flush()
-    
-    # Add new mappings
+    quiz = db.query(db_models.Quiz).options(
+        noload(db_models.Quiz.questions)
+    ).filter(db_models.Quiz.id == quiz_id).with_for_update().first()
+    if not quiz:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+
+    desired = {}
+    numbers = set()
     for question in question_map.questions:
-        quiz_question = db_models.QuizQuestion(
-            quiz_id=quiz_id,
-            question_id=question.question_id,
-            question_number=question.question_number,
-            marks=question.marks
-        )
-        db.add(quiz_question)
-    
+        if question.question_id in desired:
+            raise ValueError(f"Question {question.question_id} is mapped more than once")
+        if question.question_number in numbers:
+            raise ValueError(f"Question number {question.question_number} is used more than once")
+        desired[question.question_id] = question
+        numbers.add(question.question_number)
+
+    # Validate every referenced question in one round trip
+    found = set(db.execute(
+        select(db_models.Question.id).where(db_models.Question.id.in_(list(desired)))
+    ).scalars())
+    missing = sorted(set(desired) - found)
+    if missing:
+        raise ValueError(f"Questions not found: {', '.join(str(question_id) for question_id in missing)}")
+
+    existing = db.execute(select(
+        db_models.QuizQuestion.id,
+        db_models.QuizQuestion.question_id,
+        db_models.QuizQuestion.question_number,
+        db_models.QuizQuestion.marks,
+    ).where(db_models.QuizQuestion.quiz_id == quiz_id)).all()
+
+    # Diff against what is already mapped so unchanged rows are never touched
+    inserts, updates, deletes = [], [], []
+    kept = set()
+    for row in existing:
+        wanted = desired.get(row.question_id)
+        if wanted is None or row.question_id in kept:
+            deletes.append(row.id)
+            continue
+        kept.add(row.question_id)
+        if (row.question_number, row.marks) != (wanted.question_number, wanted.marks):
+            updates.append({"id": row.id, "question_number": wanted.question_number, "marks": wanted.marks})
+    for question_id, question in desired.items():
+        if question_id not in kept:
+            inserts.append({
+                "quiz_id": quiz_id,
+                "question_id": question_id,
+                "question_number": question.question_number,
+                "marks": question.marks,
+            })
+
+    if deletes:
+        db.execute(delete(db_models.QuizQuestion).where(db_models.QuizQuestion.id.in_(deletes)))
+    if updates:
+        db.execute(update(db_models.QuizQuestion), updates)
+    if inserts:
+        db.execute(insert(db_models.QuizQuestion), inserts)
+
+    # Totals follow the mapping; a new mapping is a new content version, so
+    # cached payloads of the old one are left alone
+    quiz.total_questions = len(desired)
+    quiz.total_score = sum(question.marks for question in desired.values())
+    quiz.content_version = compute_content_version(quiz, [
+        (question.question_id, question.question_number, question.marks)
+        for question in desired.values()
+    ])
     db.commit()
-    
-    # Fetch and return updated quiz
-    quiz = get_quiz_by_id(db, quiz_id)
-    return quiz
+    invalidate_quiz_analytics(quiz_id)
+    if quiz.published_at is not None:
+        if desired:
+            write_quiz_snapshot(db, quiz_id)
+        else:
+            quiz_snapshot.delete_snapshot(quiz_id)
+
+    return {
+        "quiz_id": quiz_id,
+        "content_version": quiz.content_version,
+        "total_questions": quiz.total_questions,
+        "total_score": quiz.total_score,
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "unchanged": len(kept) - len(updates),
+    }
 
 def get_user_quizzes(db: Session, user_id: int):
     return db.query(db_models.Quiz).filter(db_models.Quiz.creator_id == user_id).all()
 
-def start_quiz(db: Session, quiz_id: int, user_id: int):
-    # Create new attempt
+def _attempts_db_for_write(db: Session, quiz_id: int, availability):
+    # Writes route on the shard just read from the catalog, never on a cached one
+    if availability.moving_since is not None:
+        raise QuizMovingError(f"Quiz {quiz_id} is being moved to another shard, retry shortly")
+    remember_quiz_shard(quiz_id, availability.shard)
+    return shard_session(db, availability.shard)
+
+def start_quiz(db: Session, quiz_id: int, user_id: int, quiz: dict):
+    availability = db.execute(_quiz_availability_stmt, {"quiz_id": quiz_id}).first()
+    # Archived quizzes are closed for new attempts
+    if availability is None or availability.archived_at:
+        return None
+    check_quiz_window(availability.opens_at, availability.closes_at)
+    attempts_db = _attempts_db_for_write(db, quiz_id, availability)
+
+    # Create new attempt; it is graded on the questions drawn here, whatever
+    # happens to the quiz's mapping before it is submitted
+    seed = secrets.randbits(31)
     attempt = db_models.QuizAttempt(
+        id=next_attempt_id(),
         quiz_id=quiz_id,
         user_id=user_id,
-        status="in_progress"
+        status="in_progress",
+        shuffle_seed=seed,
+        content_version=quiz["content_version"],
+        question_ids=response_store.pack_question_ids(attempt_question_ids(quiz, seed)),
     )
-    db.add(attempt)
-    db.commit()
-    db.refresh(attempt)
+    attempts_db.add(attempt)
+    attempts_db.commit()
+    attempts_db.refresh(attempt)
+    live_hub.hub.publish(quiz_id, "attempt_started", {
+        "attempt_id": attempt.id,
+        "user_id": user_id,
+        "start_time": attempt.start_time,
+    })
     return attempt
 
 def submit_quiz(db: Session, quiz_id: int, user_id: int, responses: schemas.QuizAttemptCreate):
+    availability = db.execute(_quiz_availability_stmt, {"quiz_id": quiz_id}).first()
+    if availability is None:
+        return None
+    attempts_db = _attempts_db_for_write(db, quiz_id, availability)
+
     # Get the most recent attempt for this quiz by this user
-    attempt = db.query(db_models.QuizAttempt).filter(
-        db_models.QuizAttempt.quiz_id == quiz_id,
-        db_models.QuizAttempt.user_id == user_id,
-        db_models.QuizAttempt.status == "in_progress"
-    ).order_by(db_models.QuizAttempt.start_time.desc()).first()
+    attempt = attempts_db.execute(_in_progress_attempt_stmt, {"quiz_id": quiz_id, "user_id": user_id}).scalars().first()
     
     if not attempt:
         return None
+
+    check_quiz_window(None, availability.closes_at, grace_seconds=archive_service.SUBMIT_GRACE_SECONDS)
     
     score = 0
-    total_questions = len(responses.responses)
-    
-    # Record responses
+
+    if attempt.question_ids is not None:
+        question_ids = response_store.unpack_question_ids(attempt.question_ids)
+        content_version = attempt.content_version
+    else:
+        # Attempts started before their questions were stored
+        quiz = get_cached_quiz(db, quiz_id)
+        question_ids = attempt_question_ids(quiz, attempt.shuffle_seed)
+        content_version = quiz["content_version"]
+
+    # Every quiz is scored out of the questions this attempt was shown, with
+    # one answer each (the last, if a question is sent twice); answers to
+    # anything else are ignored
+    shown = set(question_ids)
+    selected = {}
     for response in responses.responses:
-        # Check if the selected option is correct and get marks
-        question = db.query(db_models.Question).get(response.question_id)
-        marks = 0
-        if question:
-            correct_option = next((opt for opt in question.options if opt.id == response.selected_option_id and opt.is_correct), None)
-            if correct_option:
+        if response.question_id in shown:
+            selected[response.question_id] = response.selected_option_id
+    total_questions = len(question_ids)
+    
+    is_correct = get_grader(db, quiz_id, content_version, question_ids)
+    if response_store.COMPACT_RESPONSES:
+        # One packed array per attempt, aligned with the attempt's question order
+        option_ids = [selected.get(question_id, 0) for question_id in question_ids]
+        correct = [is_correct(question_id, option_id) for question_id, option_id in zip(question_ids, option_ids)]
+        score = sum(correct)
+        attempt.packed_options = response_store.pack_options(option_ids)
+        attempt.correct_bitmap = response_store.pack_correct(correct)
+        packed_responses = [
+            {"question_id": question_id, "selected_option_id": option_id, "marks_obtained": int(option_correct)}
+            for question_id, option_id, option_correct in zip(question_ids, option_ids, correct)
+            if option_id
+        ]
+    else:
+        # Record responses
+        for question_id, selected_option_id in selected.items():
+            # Check if the selected option is correct and get marks
+            marks = 0
+            if is_correct(question_id, selected_option_id):
                 marks = 1  # Or any other scoring logic
                 score += marks
 
-        quiz_response = db_models.QuizResponse(
-            attempt_id=attempt.id,
-            question_id=response.question_id,
-            selected_option_id=response.selected_option_id,
-            marks_obtained=marks
-        )
-        db.add(quiz_response)
+            quiz_response = db_models.QuizResponse(
+                attempt_id=attempt.id,
+                question_id=question_id,
+                selected_option_id=selected_option_id,
+                marks_obtained=marks
+            )
+            attempts_db.add(quiz_response)
     
     # Update attempt status and score
+    attempt.content_version = content_version
     attempt.status = "completed"
     attempt.end_time = datetime.now()
     attempt.score = (score / total_questions * 100) if total_questions > 0 else 0
     
-    db.commit()
-    db.refresh(attempt)
+    attempts_db.commit()
+    attempts_db.refresh(attempt)
+    invalidate_quiz_analytics(quiz_id)
+    live_hub.hub.publish(quiz_id, "attempt_completed", {
+        "attempt_id": attempt.id,
+        "user_id": user_id,
+        "score": attempt.score,
+        "correct_answers": score,
+        "total_questions": total_questions,
+        "completion_time": attempt.end_time,
+    })
+    if response_store.is_packed(attempt):
+        return _attempt_with_responses(attempt, packed_responses)
     return attempt
 
+def _attempt_with_responses(attempt: db_models.QuizAttempt, responses):
+    if not response_store.is_packed(attempt):
+        return attempt
+    return {
+        "id": attempt.id,
+        "quiz_id": attempt.quiz_id,
+        "user_id": attempt.user_id,
+        "start_time": attempt.start_time,
+        "end_time": attempt.end_time,
+        "score": attempt.score,
+        "status": attempt.status,
+        "responses": responses,
+    }
+
 def get_quiz_participants(db: Session, quiz_id: int):
-    attempts = db.query(db_models.QuizAttempt).filter(
+    attempts = quiz_shard_session(db, quiz_id).query(db_models.QuizAttempt).filter(
         db_models.QuizAttempt.quiz_id == quiz_id
     ).all()
-    return attempts
+    # Archiving leaves attempts still in progress live, so both can exist
+    archived = archive_service.get_archived_attempts(db, quiz_id)
+    if not attempts:
+        return archived
+    packed = [attempt for attempt in attempts if response_store.is_packed(attempt)]
+    responses = dict(zip((attempt.id for attempt in packed), response_store.attempts_responses(db, packed)))
+    return [_attempt_with_responses(attempt, responses.get(attempt.id)) for attempt in attempts] + archived
 
 def get_quiz_user_response(db: Session, quiz_id: int, user_id: int):
     # Get the most recent attempt for this quiz by this user
-    attempt = db.query(db_models.QuizAttempt).filter(
+    attempt = quiz_shard_session(db, quiz_id).query(db_models.QuizAttempt).filter(
         db_models.QuizAttempt.quiz_id == quiz_id,
         db_models.QuizAttempt.user_id == user_id
     ).order_by(db_models.QuizAttempt.start_time.desc()).first()
     
     if not attempt:
-        return None
+        return archive_service.get_archived_user_response(db, quiz_id, user_id)
     
     responses = []
-    for response in attempt.responses:
-        responses.append({
-            "question_id": response.question_id,
-            "selected_option_id": response.selected_option_id
-        })
+    if response_store.is_packed(attempt):
+        for response in response_store.attempt_responses(db, attempt):
+            responses.append({
+                "question_id": response["question_id"],
+                "selected_option_id": response["selected_option_id"]
+            })
+    else:
+        for response in attempt.responses:
+            responses.append({
+                "question_id": response.question_id,
+                "selected_option_id": response.selected_option_id
+            })
     
     return {
         "attempt_id": attempt.id,
@@ -262,24 +764,88 @@ def get_quiz_user_response(db: Session, quiz_id: int, user_id: int):
         "responses": responses
     }
 
+def _encode_history_cursor(start_time: datetime, attempt_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([start_time.isoformat(), attempt_id]).encode()).decode()
+
+def _decode_history_cursor(cursor: str):
+    try:
+        start_time, attempt_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(start_time), int(attempt_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def get_user_attempt_history(db: Session, user_id: int, limit: int = 20, cursor: str | None = None):
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    after = _decode_history_cursor(cursor) if cursor else None
+
+    # Live and archived attempts share ids, so (start_time, id) orders both.
+    # Each side is an index range scan on its (user_id, start_time desc, id
+    # desc) index capped at one page; a user's attempts are spread over every
+    # shard, so each database returns at most one page and the pages are
+    # merged here. Only the merged page looks up quiz titles.
+    def page(model, archived: bool):
+        stmt = select(
+            model.id, model.quiz_id, model.start_time, model.end_time, model.score, model.status,
+            literal(archived).label("archived"),
+        ).where(model.user_id == user_id)
+        if after:
+            stmt = stmt.where(tuple_(model.start_time, model.id) < tuple_(*after))
+        stmt = stmt.order_by(model.start_time.desc(), model.id.desc()).limit(limit + 1)
+        return select(stmt.subquery())
+
+    attempts = union_all(
+        page(db_models.QuizAttempt, False),
+        page(db_models.QuizAttemptArchive, True),
+    ).subquery()
+    merged = select(attempts).order_by(attempts.c.start_time.desc(), attempts.c.id.desc()).limit(limit + 1)
+    rows = []
+    for attempts_db in all_attempt_sessions(db):
+        rows.extend(attempts_db.execute(merged).all())
+    rows.sort(key=lambda row: (row.start_time, row.id), reverse=True)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    titles = dict(db.execute(select(db_models.Quiz.id, db_models.Quiz.title).where(
+        db_models.Quiz.id.in_({row.quiz_id for row in rows})
+    )).all()) if rows else {}
+    return {
+        "items": [
+            {
+                "attempt_id": row.id,
+                "quiz_id": row.quiz_id,
+                "quiz_title": titles.get(row.quiz_id),
+                "start_time": row.start_time,
+                "end_time": row.end_time,
+                "score": row.score,
+                "status": row.status,
+                "archived": bool(row.archived),
+            }
+            for row in rows
+        ],
+        "next_cursor": _encode_history_cursor(rows[-1].start_time, rows[-1].id) if has_more else None,
+    }
+
 def get_quiz_scores(db: Session, quiz_id: int):
     # Get all attempts for this quiz
-    attempts = db.query(db_models.QuizAttempt).filter(
-        db_models.QuizAttempt.quiz_id == quiz_id,
-        db_models.QuizAttempt.end_time.isnot(None)  # Only get completed attempts
-    ).all()
+    attempts_db = quiz_shard_session(db, quiz_id)
+    attempts = attempts_db.execute(_completed_attempts_stmt, {"quiz_id": quiz_id}).scalars().all()
+    if not attempts:
+        return archive_service.get_archived_scores(db, quiz_id)
+
+    # One grouped query instead of two counts per attempt
+    response_counts = {
+        attempt_id: (int(correct or 0), total)
+        for attempt_id, correct, total in attempts_db.execute(_response_counts_stmt, {"quiz_id": quiz_id})
+    }
     
     scores = []
     for attempt in attempts:
-        # Calculate number of correct answers (where marks_obtained > 0)
-        correct_answers = db.query(func.count(db_models.QuizResponse.id)).filter(
-            db_models.QuizResponse.attempt_id == attempt.id,
-            db_models.QuizResponse.marks_obtained > 0
-        ).scalar()
-        
-        total_questions = db.query(func.count(db_models.QuizResponse.id)).filter(
-            db_models.QuizResponse.attempt_id == attempt.id
-        ).scalar()
+        if response_store.is_packed(attempt):
+            # Counted straight off the bitmap, no response rows to scan
+            correct_answers, total_questions = response_store.packed_counts(attempt)
+        else:
+            # Correct answers are the responses with marks_obtained > 0
+            correct_answers, total_questions = response_counts.get(attempt.id, (0, 0))
         
         scores.append({
             "user_id": attempt.user_id,
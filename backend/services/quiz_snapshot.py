@@ -0,0 +1,193 @@
+import json
+import mmap
+import os
+import stat
+import struct
+import tempfile
+import threading
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+import services.compression as compression
+
+# Published quizzes are written here as one immutable file each. Every worker
+# on the host maps the same file, so the bytes live once in the page cache
+# instead of once per process. Grading trusts the answer keys in these files,
+# so the directory must belong to the app's user and be closed to everyone else.
+SNAPSHOT_DIR = os.getenv("QUIZ_SNAPSHOT_DIR", os.path.join(os.path.expanduser("~"), ".cache", "quiz-snapshots"))
+
+MAGIC = b"QSNP"
+FORMAT_VERSION = 1
+
+# magic, format version, quiz id, content version, then (offset, length) per section
+_HEADER = struct.Struct("<4sHxxq16s")
+_SECTION = struct.Struct("<QQ")
+SECTIONS = ("payload", "gzip", "br", "answer_key")
+
+_lock = threading.Lock()
+_open_snapshots = {}  # quiz_id -> ((inode, mtime, size), QuizSnapshot)
+_trusted_dirs = {}  # path -> whether it passed the ownership check
+
+
+def _snapshot_dir_trusted(create: bool = False) -> bool:
+    # Checked once per directory. A refused one disables snapshots and every
+    # quiz is served and graded from the database instead.
+    trusted = _trusted_dirs.get(SNAPSHOT_DIR)
+    if trusted is not None:
+        return trusted
+    if create:
+        os.makedirs(SNAPSHOT_DIR, mode=0o700, exist_ok=True)
+    try:
+        info = os.lstat(SNAPSHOT_DIR)
+    except FileNotFoundError:
+        return False
+    owner = os.getuid() if hasattr(os, "getuid") else info.st_uid
+    trusted = stat.S_ISDIR(info.st_mode) and info.st_uid == owner and not info.st_mode & 0o077
+    if not trusted:
+        print(f"Warning: not using quiz snapshot directory {SNAPSHOT_DIR}: "
+              f"it must be a directory owned by this user with mode 0700")
+    _trusted_dirs[SNAPSHOT_DIR] = trusted
+    return trusted
+
+
+def snapshot_path(quiz_id: int) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"quiz-{quiz_id}.snap")
+
+
+def _answer_key_entry(question_id, option_id):
+    # Both ids in 32 bits, or None: wider ids would overflow int64 or alias
+    # another (question, option) pair
+    if not (0 <= question_id < 1 << 32 and 0 <= option_id < 1 << 32):
+        return None
+    return (question_id << 32) | option_id
+
+
+def _answer_key_array(answer_key) -> np.ndarray:
+    # One sorted int64 per correct (question, option) pair, searched in place
+    entries = []
+    for question_id, option_ids in answer_key.items():
+        for option_id in option_ids:
+            entry = _answer_key_entry(question_id, option_id)
+            if entry is None:
+                raise ValueError(f"Question {question_id} option {option_id} does not fit a snapshot answer key")
+            entries.append(entry)
+    return np.array(sorted(entries), dtype="<i8")
+
+
+def write_snapshot(quiz_id: int, content_version: str, payload: dict, answer_key):
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+    encoded = compression.EncodedBody(body).encoded
+    sections = [body, encoded.get("gzip", b""), encoded.get("br", b""), _answer_key_array(answer_key).tobytes()]
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, quiz_id, content_version.encode().ljust(16, b"\0"))
+    offset = len(header) + _SECTION.size * len(sections)
+    table, chunks = [], []
+    for section in sections:
+        padding = -offset % 8  # keeps the int64 answer key aligned
+        chunks.append(b"\0" * padding + section)
+        offset += padding
+        table.append(_SECTION.pack(offset, len(section)))
+        offset += len(section)
+
+    # Write aside and rename over the old file: readers either see the whole
+    # old snapshot or the whole new one, and open mappings of the old file
+    # stay valid until they are dropped
+    if not _snapshot_dir_trusted(create=True):
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, prefix=f".quiz-{quiz_id}-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.writelines(table)
+            f.writelines(chunks)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, snapshot_path(quiz_id))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def delete_snapshot(quiz_id: int):
+    try:
+        os.unlink(snapshot_path(quiz_id))
+    except FileNotFoundError:
+        pass
+
+
+def snapshot_quiz_ids():
+    if not _snapshot_dir_trusted():
+        return []
+    return [
+        int(name[len("quiz-"):-len(".snap")])
+        for name in os.listdir(SNAPSHOT_DIR)
+        if name.startswith("quiz-") and name.endswith(".snap")
+    ]
+
+
+class QuizSnapshot:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.quiz_id, content_version = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported quiz snapshot {path}")
+        self.content_version = content_version.rstrip(b"\0").decode()
+        view = memoryview(self._mmap)
+        self._sections = {}
+        for index, name in enumerate(SECTIONS):
+            offset, length = _SECTION.unpack_from(self._mmap, _HEADER.size + index * _SECTION.size)
+            self._sections[name] = view[offset:offset + length]
+        self._answer_key = np.frombuffer(self._sections["answer_key"], dtype="<i8")
+        # Responses are served straight from the mapping, without copies
+        self._body = compression.EncodedBody(self._sections["payload"], encoded={
+            encoding: self._sections[encoding]
+            for encoding in compression.ENCODINGS if len(self._sections[encoding])
+        })
+        self._payload = None
+
+    def payload(self) -> dict:
+        # Decoded once per mapping and shared, like the in-process payload cache
+        if self._payload is None:
+            self._payload = json.loads(bytes(self._sections["payload"]))
+        return self._payload
+
+    def encoded_body(self) -> compression.EncodedBody:
+        return self._body
+
+    def is_correct(self, question_id: int, option_id) -> bool:
+        if option_id is None:
+            return False
+        key = _answer_key_entry(question_id, option_id)
+        if key is None:
+            return False
+        index = int(np.searchsorted(self._answer_key, key))
+        return index < len(self._answer_key) and int(self._answer_key[index]) == key
+
+
+def get_snapshot(quiz_id: int):
+    # One stat per lookup notices a snapshot swapped by any worker; the old
+    # mapping is simply dropped and unmapped once nothing references it
+    if not _snapshot_dir_trusted():
+        return None
+    path = snapshot_path(quiz_id)
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        with _lock:
+            _open_snapshots.pop(quiz_id, None)
+        return None
+    key = (info.st_ino, info.st_mtime_ns, info.st_size)
+    with _lock:
+        cached = _open_snapshots.get(quiz_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+    try:
+        snapshot = QuizSnapshot(path)
+    except FileNotFoundError:
+        return None
+    with _lock:
+        _open_snapshots[quiz_id] = (key, snapshot)
+    return snapshot
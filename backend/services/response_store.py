@@ -0,0 +1,119 @@
+import os
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+import database.db_models as db_models
+from database.db_connect import quiz_shard_session
+
+# Store completed attempts as packed arrays on quiz_attempts instead of one
+# quiz_responses row per answer
+COMPACT_RESPONSES = os.getenv("COMPACT_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def pack_options(option_ids) -> bytes:
+    # Selected option id per question in question order, 0 when unanswered
+    return np.asarray(option_ids, dtype="<i4").tobytes()
+
+
+def pack_question_ids(question_ids) -> bytes:
+    # Questions an attempt was shown, fixed when it starts
+    return np.asarray(question_ids, dtype="<i4").tobytes()
+
+
+def unpack_question_ids(packed: bytes):
+    return np.frombuffer(packed, dtype="<i4").tolist()
+
+
+def pack_correct(correct) -> bytes:
+    return np.packbits(np.asarray(correct, dtype=bool)).tobytes()
+
+
+def unpack_attempt(attempt):
+    options = np.frombuffer(attempt.packed_options, dtype="<i4")
+    correct = np.unpackbits(
+        np.frombuffer(attempt.correct_bitmap, dtype=np.uint8), count=len(options)
+    ).astype(bool)
+    return options, correct
+
+
+def is_packed(attempt) -> bool:
+    return getattr(attempt, "packed_options", None) is not None
+
+
+def _option_questions(db: Session, option_ids):
+    # Options belong to exactly one question, so the question id never needs storing
+    if not len(option_ids):
+        return {}
+    rows = db.execute(select(
+        db_models.QuestionOption.id, db_models.QuestionOption.question_id
+    ).where(
+        db_models.QuestionOption.id.in_(sorted(set(option_ids)))
+    )).all()
+    return dict(rows)
+
+
+def packed_counts(attempt):
+    options, correct = unpack_attempt(attempt)
+    answered = options != 0
+    return int((correct & answered).sum()), int(answered.sum())
+
+
+def attempts_responses(db: Session, attempts):
+    # Response dicts per attempt, resolving every attempt's options in one
+    # query. Selected ids that are no option at all (clients send whatever
+    # they like) are left out.
+    answers = []
+    for attempt in attempts:
+        options, correct = unpack_attempt(attempt)
+        answered = options != 0
+        answers.append((options[answered].tolist(), correct[answered].tolist()))
+    question_for = _option_questions(db, [option_id for option_ids, _ in answers for option_id in option_ids])
+    return [
+        [
+            {
+                "question_id": question_for[option_id],
+                "selected_option_id": option_id,
+                "marks_obtained": int(is_correct),
+            }
+            for option_id, is_correct in zip(option_ids, correct)
+            if option_id in question_for
+        ]
+        for option_ids, correct in answers
+    ]
+
+
+def attempt_responses(db: Session, attempt):
+    return attempts_responses(db, [attempt])[0]
+
+
+def packed_response_columns(db: Session, quiz_id: int, completed_only: bool = True):
+    # (attempt_id, question_id, selected_option_id, marks) rows for packed
+    # attempts, shaped like the quiz_responses columns analytics and archival read
+    stmt = select(
+        db_models.QuizAttempt.id,
+        db_models.QuizAttempt.packed_options,
+        db_models.QuizAttempt.correct_bitmap,
+    ).where(
+        db_models.QuizAttempt.quiz_id == quiz_id,
+        db_models.QuizAttempt.packed_options.isnot(None),
+    )
+    if completed_only:
+        stmt = stmt.where(db_models.QuizAttempt.status == "completed")
+
+    attempt_ids, option_chunks, correct_chunks = [], [], []
+    for attempt in quiz_shard_session(db, quiz_id).execute(stmt):
+        options, correct = unpack_attempt(attempt)
+        answered = options != 0
+        attempt_ids.append(np.full(int(answered.sum()), attempt.id, dtype=np.int64))
+        option_chunks.append(options[answered].astype(np.int64))
+        correct_chunks.append(correct[answered].astype(np.int64))
+
+    if not attempt_ids:
+        return np.empty((0, 4), dtype=np.int64)
+
+    option_ids = np.concatenate(option_chunks)
+    question_for = _option_questions(db, option_ids.tolist())
+    question_ids = np.array([question_for.get(option_id, 0) for option_id in option_ids.tolist()], dtype=np.int64)
+    return np.column_stack([np.concatenate(attempt_ids), question_ids, option_ids, np.concatenate(correct_chunks)])
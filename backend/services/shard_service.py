@@ -0,0 +1,278 @@
+from datetime import datetime, timedelta
+import os
+import time
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session, noload
+
+import database.db_models as db_models
+from database.db_connect import SHARD_DIRECTORY_TTL_SECONDS, ShardSessions, forget_quiz_shard, shard_session
+from services.archive_service import SUBMIT_GRACE_SECONDS
+
+# Once a quiz is frozen, writes already routed to its old shard get this long
+# to land before the copy starts; after the flip the old copy is kept this
+# long for readers still holding the cached placement
+MOVE_SETTLE_SECONDS = float(os.getenv("SHARD_MOVE_SETTLE_SECONDS", str(SHARD_DIRECTORY_TTL_SECONDS + 1)))
+
+# Rows copied per round trip when moving a quiz
+MOVE_BATCH_SIZE = 1000
+
+# A quiz opening within this long counts as running already, so the
+# rebalancer doesn't freeze it just as students start
+ACTIVE_QUIZ_MARGIN_SECONDS = float(os.getenv("SHARD_ACTIVE_QUIZ_MARGIN_SECONDS", "900"))
+
+
+def location_name(shard) -> str:
+    return "catalog" if shard is None else f"shard {shard}"
+
+
+def _locations(db: Session):
+    return [(None, db), *((shard, shard_session(db, shard)) for shard in range(len(ShardSessions)))]
+
+
+def _attempt_counts(attempts_db: Session, model):
+    return dict(attempts_db.execute(select(model.quiz_id, func.count()).group_by(model.quiz_id)).all())
+
+
+def _window_open(quiz, now: datetime) -> bool:
+    # Quizzes without a window are judged by their attempts alone
+    if quiz.opens_at is None and quiz.closes_at is None:
+        return False
+    if quiz.opens_at is not None and now < quiz.opens_at - timedelta(seconds=ACTIVE_QUIZ_MARGIN_SECONDS):
+        return False
+    return quiz.closes_at is None or now <= quiz.closes_at + timedelta(seconds=SUBMIT_GRACE_SECONDS)
+
+
+def _attempt_running(quiz, started: datetime | None, now: datetime) -> bool:
+    # `started` is the latest in-progress attempt's start; older ones are past
+    # their duration and abandoned rather than still being answered
+    if started is None:
+        return False
+    return now <= started.replace(tzinfo=None) + timedelta(minutes=quiz.duration, seconds=SUBMIT_GRACE_SECONDS)
+
+
+def _latest_in_progress(attempts_db: Session, quiz_id: int | None = None):
+    stmt = select(db_models.QuizAttempt.quiz_id, func.max(db_models.QuizAttempt.start_time)).where(
+        db_models.QuizAttempt.status == "in_progress"
+    ).group_by(db_models.QuizAttempt.quiz_id)
+    if quiz_id is not None:
+        stmt = stmt.where(db_models.QuizAttempt.quiz_id == quiz_id)
+    return dict(attempts_db.execute(stmt).all())
+
+
+def active_quiz_ids(db: Session, now: datetime | None = None):
+    # Quizzes students may be writing to. Freezing one makes its submits
+    # answer 503 until the move is done, so the rebalancer leaves them alone.
+    now = now or datetime.utcnow()
+    quizzes = {quiz.id: quiz for quiz in db.execute(select(
+        db_models.Quiz.id, db_models.Quiz.shard, db_models.Quiz.duration, db_models.Quiz.opens_at, db_models.Quiz.closes_at,
+    ))}
+    active = {quiz_id for quiz_id, quiz in quizzes.items() if _window_open(quiz, now)}
+    for shard, attempts_db in _locations(db):
+        for quiz_id, started in _latest_in_progress(attempts_db).items():
+            quiz = quizzes.get(quiz_id)
+            if quiz is not None and quiz.shard == shard and _attempt_running(quiz, started, now):
+                active.add(quiz_id)
+    return active
+
+
+def quiz_is_active(db: Session, quiz, now: datetime | None = None) -> bool:
+    now = now or datetime.utcnow()
+    if _window_open(quiz, now):
+        return True
+    started = _latest_in_progress(shard_session(db, quiz.shard), quiz.id).get(quiz.id)
+    return _attempt_running(quiz, started, now)
+
+
+def shard_report(db: Session):
+    # Per database: live and archived attempts of the quizzes placed there, and
+    # rows left behind for quizzes placed elsewhere (an interrupted move)
+    placement = dict(db.execute(select(db_models.Quiz.id, db_models.Quiz.shard)).all())
+    report = {}
+    for shard, attempts_db in _locations(db):
+        live = _attempt_counts(attempts_db, db_models.QuizAttempt)
+        archived = _attempt_counts(attempts_db, db_models.QuizAttemptArchive)
+        quizzes, orphans = {}, {}
+        for quiz_id in live.keys() | archived.keys():
+            counts = {"live": live.get(quiz_id, 0), "archived": archived.get(quiz_id, 0)}
+            if quiz_id in placement and placement[quiz_id] == shard:
+                quizzes[quiz_id] = counts
+            else:
+                orphans[quiz_id] = counts
+        report[shard] = {
+            "quizzes": quizzes,
+            "orphans": orphans,
+            "live": sum(counts["live"] for counts in quizzes.values()),
+            "archived": sum(counts["archived"] for counts in quizzes.values()),
+        }
+    return report
+
+
+def plan_rebalance(report: dict, drain_catalog: bool = False, tolerance: float = 0.1, pinned=frozenset()):
+    # Live attempts are what exam-time writes land on, so they are the load
+    # being balanced; archived rows simply travel with their quiz. Quizzes in
+    # `pinned` (running ones) count towards their shard's load but never move.
+    shards = [shard for shard in report if shard is not None]
+    if not shards:
+        return []
+    load = {shard: report[shard]["live"] for shard in shards}
+    quizzes = {
+        shard: {quiz_id: counts["live"] for quiz_id, counts in report[shard]["quizzes"].items()}
+        for shard in shards
+    }
+    moves = []
+
+    if drain_catalog:
+        catalog = report[None]["quizzes"]
+        for quiz_id in sorted(catalog, key=lambda quiz_id: -catalog[quiz_id]["live"]):
+            if quiz_id in pinned:
+                continue
+            target = min(shards, key=lambda shard: load[shard])
+            weight = catalog[quiz_id]["live"]
+            moves.append((quiz_id, None, target, weight))
+            load[target] += weight
+            quizzes[target][quiz_id] = weight
+
+    # Greedy: move the quiz that best halves the gap between the heaviest and
+    # the lightest shard until they are within `tolerance` of the mean
+    for _ in range(sum(len(placed) for placed in quizzes.values())):
+        heaviest = max(shards, key=lambda shard: load[shard])
+        lightest = min(shards, key=lambda shard: load[shard])
+        gap = load[heaviest] - load[lightest]
+        mean = sum(load.values()) / len(shards)
+        if gap <= tolerance * mean:
+            break
+        candidates = [(quiz_id, weight) for quiz_id, weight in quizzes[heaviest].items()
+                      if 0 < weight < gap and quiz_id not in pinned]
+        if not candidates:
+            break
+        quiz_id, weight = min(candidates, key=lambda candidate: abs(gap / 2 - candidate[1]))
+        moves.append((quiz_id, heaviest, lightest, weight))
+        del quizzes[heaviest][quiz_id]
+        quizzes[lightest][quiz_id] = weight
+        load[heaviest] -= weight
+        load[lightest] += weight
+    return moves
+
+
+def _delete_quiz_rows(attempts_db: Session, quiz_id: int):
+    attempts_db.execute(delete(db_models.QuizResponse).where(
+        db_models.QuizResponse.attempt_id.in_(
+            select(db_models.QuizAttempt.id).where(db_models.QuizAttempt.quiz_id == quiz_id)
+        )
+    ))
+    attempts_db.execute(delete(db_models.QuizAttempt).where(db_models.QuizAttempt.quiz_id == quiz_id))
+    attempts_db.execute(delete(db_models.QuizAttemptArchive).where(db_models.QuizAttemptArchive.quiz_id == quiz_id))
+
+
+def _copy(source_db: Session, target_db: Session, stmt, table) -> int:
+    copied = 0
+    result = source_db.execute(stmt.execution_options(yield_per=MOVE_BATCH_SIZE)).mappings()
+    for partition in result.partitions():
+        target_db.execute(insert(table), [dict(row) for row in partition])
+        copied += len(partition)
+    return copied
+
+
+def _copy_quiz_rows(source_db: Session, target_db: Session, quiz_id: int):
+    attempts = db_models.QuizAttempt.__table__
+    responses = db_models.QuizResponse.__table__
+    archives = db_models.QuizAttemptArchive.__table__
+    # Attempt ids are unique across shards and kept; response ids are local
+    # and only ever referenced through their attempt, so the target assigns new ones
+    return {
+        "attempts": _copy(source_db, target_db, select(attempts).where(attempts.c.quiz_id == quiz_id), attempts),
+        "responses": _copy(source_db, target_db, select(
+            responses.c.attempt_id, responses.c.question_id, responses.c.selected_option_id, responses.c.marks_obtained,
+        ).join(attempts, attempts.c.id == responses.c.attempt_id).where(attempts.c.quiz_id == quiz_id), responses),
+        "archived": _copy(source_db, target_db, select(archives).where(archives.c.quiz_id == quiz_id), archives),
+    }
+
+
+def _stored_counts(attempts_db: Session, quiz_id: int):
+    return {
+        "attempts": attempts_db.execute(select(func.count()).select_from(db_models.QuizAttempt).where(
+            db_models.QuizAttempt.quiz_id == quiz_id
+        )).scalar(),
+        "responses": attempts_db.execute(select(func.count()).select_from(db_models.QuizResponse).join(
+            db_models.QuizAttempt, db_models.QuizAttempt.id == db_models.QuizResponse.attempt_id
+        ).where(db_models.QuizAttempt.quiz_id == quiz_id)).scalar(),
+        "archived": attempts_db.execute(select(func.count()).select_from(db_models.QuizAttemptArchive).where(
+            db_models.QuizAttemptArchive.quiz_id == quiz_id
+        )).scalar(),
+    }
+
+
+def move_quiz(db: Session, quiz_id: int, target, settle_seconds: float = MOVE_SETTLE_SECONDS, force: bool = False):
+    quiz = db.query(db_models.Quiz).options(noload(db_models.Quiz.questions)).filter(db_models.Quiz.id == quiz_id).first()
+    if not quiz:
+        raise ValueError(f"Quiz with ID {quiz_id} not found")
+    source = quiz.shard
+    if source == target:
+        return {"quiz_id": quiz_id, "from": source, "to": target, "attempts": 0, "responses": 0, "archived": 0}
+    if not force and quiz_is_active(db, quiz):
+        raise ValueError(f"Quiz {quiz_id} is open or has attempts in progress; move it once it has closed")
+    source_db, target_db = shard_session(db, source), shard_session(db, target)
+
+    # Freeze: start/submit answer 503 until the flip, so nothing is written
+    # to the source while it is copied
+    quiz.moving_since = datetime.utcnow()
+    db.commit()
+    try:
+        time.sleep(settle_seconds)
+        _delete_quiz_rows(target_db, quiz_id)  # leftovers of an interrupted move
+        copied = _copy_quiz_rows(source_db, target_db, quiz_id)
+        if _stored_counts(target_db, quiz_id) != _stored_counts(source_db, quiz_id):
+            raise RuntimeError(f"Copy of quiz {quiz_id} to {location_name(target)} does not match its source")
+        target_db.commit()
+    except BaseException:
+        target_db.rollback()
+        quiz.moving_since = None  # stays where it was
+        db.commit()
+        raise
+
+    quiz.shard = target
+    quiz.moving_since = None
+    db.commit()
+    forget_quiz_shard(quiz_id)
+    print(f"Moved quiz {quiz_id} from {location_name(source)} to {location_name(target)}: {copied}")
+
+    # Readers may still route on the old placement until their cache expires
+    time.sleep(settle_seconds)
+    _delete_quiz_rows(source_db, quiz_id)
+    source_db.commit()
+    return {"quiz_id": quiz_id, "from": source, "to": target, **copied}
+
+
+def rebalance(db: Session, drain_catalog: bool = False, tolerance: float = 0.1, dry_run: bool = False,
+              settle_seconds: float = MOVE_SETTLE_SECONDS):
+    moves = plan_rebalance(shard_report(db), drain_catalog, tolerance, active_quiz_ids(db))
+    if dry_run:
+        return moves
+    moving = set(db.execute(select(db_models.Quiz.id).where(db_models.Quiz.moving_since.isnot(None))).scalars())
+    moved = []
+    for quiz_id, _, target, _ in moves:
+        if quiz_id in moving:
+            continue
+        try:
+            moved.append(move_quiz(db, quiz_id, target, settle_seconds))
+        except ValueError as e:
+            # Opened (or gone) while earlier moves were running
+            print(f"Skipped quiz {quiz_id}: {e}")
+    return moved
+
+
+def purge_orphans(db: Session):
+    # Rows a crashed move left on a database the quiz is not placed on.
+    # Quizzes mid-move legitimately have rows in two places and are skipped.
+    moving = set(db.execute(select(db_models.Quiz.id).where(db_models.Quiz.moving_since.isnot(None))).scalars())
+    purged = {}
+    for shard, placed in shard_report(db).items():
+        attempts_db = shard_session(db, shard)
+        for quiz_id, counts in placed["orphans"].items():
+            if quiz_id in moving:
+                continue
+            _delete_quiz_rows(attempts_db, quiz_id)
+            purged[(shard, quiz_id)] = counts
+        attempts_db.commit()
+    return purged
@@ -0,0 +1,136 @@
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
+import json
+import os
+import time
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import database.db_models as db_models
+from services.auth import get_password_hash
+
+# Users per multi-row INSERT
+PROVISION_BATCH_SIZE = int(os.getenv("PROVISION_BATCH_SIZE", "500"))
+
+# bcrypt is CPU bound, so hashing runs in worker processes (0 = one per core)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "0")) or os.cpu_count() or 1
+
+REQUIRED_FIELDS = ("username", "email", "password")
+
+_hash_pool = None
+
+
+def _get_hash_pool():
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    return _hash_pool
+
+
+def hash_passwords(passwords):
+    if len(passwords) < 2 or HASH_WORKERS == 1:
+        return [get_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (HASH_WORKERS * 4))
+    return list(_get_hash_pool().map(get_password_hash, passwords, chunksize=chunksize))
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "y")
+
+
+def parse_users(content: str, fmt: str):
+    # (row number, record) pairs; row numbers are 1-based data lines
+    if fmt == "csv":
+        return list(enumerate(csv.DictReader(io.StringIO(content)), 1))
+    if fmt == "jsonl":
+        rows = []
+        for row_number, line in enumerate((line for line in content.splitlines() if line.strip()), 1):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                record = {"_error": f"Invalid JSON: {exc.msg}"}
+            if not isinstance(record, dict):
+                record = {"_error": "Expected a JSON object"}
+            rows.append((row_number, record))
+        return rows
+    raise ValueError(f"Unsupported format '{fmt}', expected csv or jsonl")
+
+
+def provision_users(db: Session, rows, batch_size: int = PROVISION_BATCH_SIZE):
+    started = time.perf_counter()
+    errors = []
+    candidates = []
+    seen_usernames, seen_emails = set(), set()
+
+    for row_number, record in rows:
+        username = str(record.get("username") or "").strip()
+        email = str(record.get("email") or "").strip()
+        if "_error" in record:
+            errors.append({"row": row_number, "username": None, "error": record["_error"]})
+            continue
+        missing = [field for field in REQUIRED_FIELDS if not str(record.get(field) or "").strip()]
+        if missing:
+            errors.append({"row": row_number, "username": username or None, "error": f"Missing {', '.join(missing)}"})
+            continue
+        if username in seen_usernames:
+            errors.append({"row": row_number, "username": username, "error": "Duplicate username in upload"})
+            continue
+        if email in seen_emails:
+            errors.append({"row": row_number, "username": username, "error": "Duplicate email in upload"})
+            continue
+        seen_usernames.add(username)
+        seen_emails.add(email)
+        candidates.append((row_number, username, email, str(record["password"]), _parse_bool(record.get("is_admin"))))
+
+    # One query finds every username and email that is already taken
+    taken_usernames, taken_emails = set(), set()
+    if candidates:
+        for username, email in db.execute(select(db_models.User.username, db_models.User.email).where(or_(
+            db_models.User.username.in_(seen_usernames),
+            db_models.User.email.in_(seen_emails),
+        ))):
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+    accepted = []
+    for candidate in candidates:
+        row_number, username, email = candidate[:3]
+        if username in taken_usernames:
+            errors.append({"row": row_number, "username": username, "error": "Username already registered"})
+        elif email in taken_emails:
+            errors.append({"row": row_number, "username": username, "error": "Email already registered"})
+        else:
+            accepted.append(candidate)
+
+    hash_started = time.perf_counter()
+    hashed = hash_passwords([candidate[3] for candidate in accepted])
+    hash_seconds = time.perf_counter() - hash_started
+
+    users = [
+        {"username": username, "email": email, "hashed_password": hashed_password, "is_admin": is_admin}
+        for (_, username, email, _, is_admin), hashed_password in zip(accepted, hashed)
+    ]
+    try:
+        for start in range(0, len(users), batch_size):
+            db.execute(insert(db_models.User), users[start:start + batch_size])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise ValueError("Some users were registered concurrently; nothing was created, retry the upload")
+
+    finished = time.perf_counter()
+    errors.sort(key=lambda error: error["row"])
+    elapsed = finished - started
+    return {
+        "created": len(users),
+        "failed": len(errors),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "hash_seconds": round(hash_seconds, 3),
+        "users_per_second": round(len(users) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
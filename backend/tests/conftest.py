@@ -0,0 +1,108 @@
+import itertools
+import os
+import sys
+import tempfile
+
+# The database and snapshot directory are picked at import time, so the
+# environment has to be in place before anything from the app is imported
+_tmp = tempfile.mkdtemp(prefix="quiz-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'catalog.db')}"
+os.environ["QUIZ_SNAPSHOT_DIR"] = os.path.join(_tmp, "snapshots")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ["EXAM_SCHEDULER_ENABLED"] = "false"
+os.environ["ADMISSION_CONTROL"] = "false"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database.db_models as db_models
+import main
+from database.db_connect import SessionLocal
+from services.auth import create_access_token
+
+_names = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    def make(is_admin: bool = False):
+        name = f"user-{next(_names)}"
+        user = db_models.User(username=name, email=f"{name}@example.com", hashed_password="x", is_admin=is_admin)
+        db.add(user)
+        db.commit()
+        return user
+    return make
+
+
+def auth(user: db_models.User):
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.username})}"}
+
+
+@pytest.fixture
+def make_questions(db):
+    # Three options each; the first one is correct
+    def make(count: int, creator=None):
+        questions = []
+        for n in range(count):
+            question = db_models.Question(question_text=f"Question {next(_names)}", creator_id=creator.id if creator else None)
+            db.add(question)
+            db.flush()
+            for o in range(3):
+                db.add(db_models.QuestionOption(question_id=question.id, option=f"Option {o}", is_correct=o == 0))
+            questions.append(question.id)
+        db.commit()
+        return questions
+    return make
+
+
+@pytest.fixture
+def make_quiz(client):
+    def make(creator, question_ids, **fields):
+        response = client.post("/api/quizzes/", headers=auth(creator), json={
+            "title": "Quiz", "total_questions": len(question_ids), "total_score": len(question_ids), "duration": 10,
+            **fields,
+        })
+        assert response.status_code == 200, response.text
+        quiz_id = response.json()["id"]
+        response = client.post(f"/api/quizzes/{quiz_id}/questions/", headers=auth(creator), json={
+            "quiz_id": quiz_id,
+            "questions": [
+                {"question_id": question_id, "question_number": n + 1, "marks": 1}
+                for n, question_id in enumerate(question_ids)
+            ],
+        })
+        assert response.status_code == 200, response.text
+        return quiz_id
+    return make
+
+
+def take_quiz(client, quiz_id: int, user, correct: int | None = None):
+    # Answers the first `correct` questions shown right and the rest wrong
+    # (all right when `correct` is None)
+    response = client.post(f"/api/quizzes/{quiz_id}/start/", headers=auth(user))
+    assert response.status_code == 200, response.text
+    questions = response.json()["quiz"]["questions"]
+    responses = []
+    for n, question in enumerate(questions):
+        options = sorted(option["id"] for option in question["options"])
+        right = correct is None or n < correct
+        responses.append({"question_id": question["id"], "selected_option_id": options[0] if right else options[1]})
+    response = client.post(f"/api/quizzes/{quiz_id}/submit/", headers=auth(user), json={"responses": responses})
+    assert response.status_code == 200, response.text
+    return questions, response.json()
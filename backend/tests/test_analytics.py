@@ -0,0 +1,50 @@
+from conftest import auth, take_quiz
+
+
+def test_analytics_are_limited_to_admins_and_the_creator(client, make_user, make_questions, make_quiz):
+    creator = make_user()
+    student = make_user()
+    quiz_id = make_quiz(creator, make_questions(3))
+    take_quiz(client, quiz_id, student)
+
+    response = client.get(f"/api/quizzes/{quiz_id}/analytics/", headers=auth(student))
+    assert response.status_code == 403
+    assert "is_correct" not in response.text
+    assert client.get(f"/api/quizzes/{quiz_id}/analytics/", headers=auth(creator)).status_code == 200
+    assert client.get(f"/api/quizzes/{quiz_id}/analytics/", headers=auth(make_user(is_admin=True))).status_code == 200
+    assert client.get("/api/quizzes/999999/analytics/", headers=auth(student)).status_code == 404
+
+
+def test_pooled_quiz_counts_only_the_questions_each_attempt_drew(client, make_user, make_questions, make_quiz):
+    creator = make_user()
+    question_ids = make_questions(6)
+    quiz_id = make_quiz(creator, question_ids, questions_per_attempt=2)
+    drawn = set()
+    for _ in range(4):
+        shown, _ = take_quiz(client, quiz_id, make_user())
+        drawn.update(question["id"] for question in shown)
+
+    analytics = client.get(f"/api/quizzes/{quiz_id}/analytics/", headers=auth(creator)).json()
+    assert analytics["attempts"] == 4
+    assert analytics["mean_score"] == 2
+    for item in analytics["questions"]:
+        if item["question_id"] in drawn:
+            assert item["difficulty"] == 1.0
+        else:
+            # Never shown to anyone: no statistics rather than "always wrong"
+            assert item["difficulty"] is None
+            assert item["discrimination"] is None
+
+
+def test_attempts_without_answers_still_count(client, make_user, make_questions, make_quiz):
+    creator = make_user()
+    quiz_id = make_quiz(creator, make_questions(2))
+    take_quiz(client, quiz_id, make_user())
+    student = make_user()
+    assert client.post(f"/api/quizzes/{quiz_id}/start/", headers=auth(student)).status_code == 200
+    assert client.post(f"/api/quizzes/{quiz_id}/submit/", headers=auth(student), json={"responses": []}).status_code == 200
+
+    analytics = client.get(f"/api/quizzes/{quiz_id}/analytics/", headers=auth(creator)).json()
+    assert analytics["attempts"] == 2
+    assert analytics["mean_score"] == 1
+    assert [item["difficulty"] for item in analytics["questions"]] == [0.5, 0.5]
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+import database.db_models as db_models
+from conftest import auth, take_quiz
+from services.archive_service import SUBMIT_GRACE_SECONDS, archive_closed_quizzes, archive_quiz
+
+
+def _close(db, quiz_id: int, seconds_ago: float):
+    db.get(db_models.Quiz, quiz_id).closes_at = datetime.utcnow() - timedelta(seconds=seconds_ago)
+    db.commit()
+
+
+def _live_statuses(db, quiz_id: int):
+    db.expire_all()
+    return sorted(db.scalars(select(db_models.QuizAttempt.status).where(db_models.QuizAttempt.quiz_id == quiz_id)))
+
+
+def test_quiet_quizzes_without_closes_at_stay_open(client, db, make_user, make_questions, make_quiz):
+    quiz_id = make_quiz(make_user(), make_questions(2))
+    take_quiz(client, quiz_id, make_user())
+    long_ago = datetime.utcnow() - timedelta(days=365)
+    db.query(db_models.QuizAttempt).filter(db_models.QuizAttempt.quiz_id == quiz_id).update(
+        {"start_time": long_ago, "end_time": long_ago}
+    )
+    db.commit()
+
+    assert quiz_id not in archive_closed_quizzes(db)
+    assert client.post(f"/api/quizzes/{quiz_id}/start/", headers=auth(make_user())).status_code == 200
+
+
+def test_quizzes_are_archived_once_the_submit_grace_has_passed(client, db, make_user, make_questions, make_quiz):
+    closes_at = (datetime.utcnow() + timedelta(hours=1)).isoformat()
+    quiz_id = make_quiz(make_user(), make_questions(2), closes_at=closes_at)
+    take_quiz(client, quiz_id, make_user())
+
+    _close(db, quiz_id, SUBMIT_GRACE_SECONDS / 2)
+    assert quiz_id not in archive_closed_quizzes(db)
+
+    _close(db, quiz_id, SUBMIT_GRACE_SECONDS + 1)
+    assert archive_closed_quizzes(db)[quiz_id] == 1
+    assert _live_statuses(db, quiz_id) == []
+
+
+def test_attempts_in_progress_are_never_archived(client, db, make_user, make_questions, make_quiz):
+    creator = make_user()
+    quiz_id = make_quiz(creator, make_questions(2))
+    take_quiz(client, quiz_id, make_user())
+    late = make_user()
+    start = client.post(f"/api/quizzes/{quiz_id}/start/", headers=auth(late))
+    assert start.status_code == 200
+
+    assert archive_quiz(db, quiz_id) == 1
+    assert _live_statuses(db, quiz_id) == ["in_progress"]
+
+    questions = start.json()["quiz"]["questions"]
+    answers = [{"question_id": q["id"], "selected_option_id": min(o["id"] for o in q["options"])} for q in questions]
+    submit = client.post(f"/api/quizzes/{quiz_id}/submit/", headers=auth(late), json={"responses": answers})
+    assert submit.status_code == 200
+    participants = client.get(f"/api/quizzes/{quiz_id}/participants/", headers=auth(creator)).json()
+    assert len(participants) == 2
+
+    # The next run picks up what was submitted after archiving
+    assert archive_closed_quizzes(db)[quiz_id] == 1
+    assert _live_statuses(db, quiz_id) == []
+    assert len(client.get(f"/api/quizzes/{quiz_id}/scores/", headers=auth(creator)).json()) == 2
@@ -0,0 +1,47 @@
+from conftest import auth
+
+QUESTION = {
+    "question_text": "Capital of France?",
+    "options": [{"option_text": "Paris", "is_correct": True}, {"option_text": "Lyon", "is_correct": False}],
+}
+
+
+def test_only_admins_create_questions(client, make_user):
+    assert client.post("/api/questions/", headers=auth(make_user()), json=QUESTION).status_code == 403
+    response = client.post("/api/questions/", headers=auth(make_user(is_admin=True)), json=QUESTION)
+    assert response.status_code == 200
+    assert [option["is_correct"] for option in response.json()["options"]] == [True, False]
+
+
+def test_students_never_see_the_answer_key(client, make_user):
+    admin = make_user(is_admin=True)
+    question_id = client.post("/api/questions/", headers=auth(admin), json=QUESTION).json()["id"]
+
+    student = client.get(f"/api/questions/{question_id}", headers=auth(make_user()))
+    assert student.status_code == 200
+    assert all(option["is_correct"] is None for option in student.json()["options"])
+
+    owner = client.get(f"/api/questions/{question_id}", headers=auth(admin))
+    assert [option["is_correct"] for option in owner.json()["options"]] == [True, False]
+
+
+def test_edit_and_versions_are_limited_to_admins_and_the_creator(client, make_user, make_questions):
+    author = make_user()
+    question_id = make_questions(1, creator=author)[0]
+    student = make_user()
+
+    assert client.put(f"/api/questions/{question_id}", headers=auth(student), json=QUESTION).status_code == 403
+    assert client.get(f"/api/questions/{question_id}/versions", headers=auth(student)).status_code == 403
+
+    edited = client.put(f"/api/questions/{question_id}", headers=auth(author), json=QUESTION)
+    assert edited.status_code == 200
+    versions = client.get(f"/api/questions/{edited.json()['id']}/versions", headers=auth(author))
+    assert versions.status_code == 200
+    assert [version["version"] for version in versions.json()] == [1, 2]
+    assert client.get(f"/api/questions/{question_id}/versions", headers=auth(make_user(is_admin=True))).status_code == 200
+
+
+def test_bank_questions_without_a_creator_are_admin_only(client, make_user, make_questions):
+    question_id = make_questions(1)[0]
+    assert client.put(f"/api/questions/{question_id}", headers=auth(make_user()), json=QUESTION).status_code == 403
+    assert client.put(f"/api/questions/{question_id}", headers=auth(make_user(is_admin=True)), json=QUESTION).status_code == 200
@@ -0,0 +1,42 @@
+from conftest import auth
+
+
+def _start(client, quiz_id: int, user):
+    response = client.post(f"/api/quizzes/{quiz_id}/start/", headers=auth(user))
+    assert response.status_code == 200, response.text
+    return response.json()["quiz"]["questions"]
+
+
+def _answer(question, right: bool = True):
+    options = sorted(option["id"] for option in question["options"])
+    return {"question_id": question["id"], "selected_option_id": options[0] if right else options[1]}
+
+
+def test_repeated_answers_count_once(client, make_user, make_questions, make_quiz):
+    quiz_id = make_quiz(make_user(), make_questions(4))
+    student = make_user()
+    questions = _start(client, quiz_id, student)
+    responses = [_answer(questions[0])] * 4 + [_answer(question, right=False) for question in questions[1:]]
+    result = client.post(f"/api/quizzes/{quiz_id}/submit/", headers=auth(student), json={"responses": responses}).json()
+    assert result["score"] == 25
+
+
+def test_unanswered_questions_count_against_the_score(client, make_user, make_questions, make_quiz):
+    quiz_id = make_quiz(make_user(), make_questions(4))
+    student = make_user()
+    questions = _start(client, quiz_id, student)
+    result = client.post(f"/api/quizzes/{quiz_id}/submit/", headers=auth(student),
+                         json={"responses": [_answer(questions[0])]}).json()
+    assert result["score"] == 25
+
+
+def test_pooled_quizzes_ignore_questions_not_drawn(client, make_user, make_questions, make_quiz):
+    question_ids = make_questions(6)
+    quiz_id = make_quiz(make_user(), question_ids, questions_per_attempt=2)
+    student = make_user()
+    questions = _start(client, quiz_id, student)
+    shown = {question["id"] for question in questions}
+    extra = [{"question_id": question_id, "selected_option_id": 0} for question_id in question_ids if question_id not in shown]
+    responses = [_answer(questions[0]), _answer(questions[0]), *extra]
+    result = client.post(f"/api/quizzes/{quiz_id}/submit/", headers=auth(student), json={"responses": responses}).json()
+    assert result["score"] == 50
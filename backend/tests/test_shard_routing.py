@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import database.db_connect as db_connect
+import database.db_models as db_models
+
+QUIZ_ID = 987654
+
+
+@pytest.fixture
+def own_engine():
+    # A database the app's global engine knows nothing about, like the
+    # benchmarks and tools build for themselves
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    db_models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(db_models.Quiz(id=QUIZ_ID, title="Elsewhere", total_questions=0, total_score=0, duration=1, shard=3))
+        session.commit()
+    yield engine
+    db_connect.forget_quiz_shard(QUIZ_ID)
+    engine.dispose()
+
+
+def test_placement_is_read_through_the_sessions_own_bind(own_engine):
+    db_connect.forget_quiz_shard(QUIZ_ID)
+    with Session(own_engine) as session:
+        assert db_connect.quiz_shard(session, QUIZ_ID) == 3
+
+
+def test_replica_sessions_read_placement_from_the_primary(own_engine, monkeypatch, db):
+    db.add(db_models.Quiz(id=QUIZ_ID, title="Catalog", total_questions=0, total_score=0, duration=1, shard=None))
+    db.commit()
+    try:
+        # Pretend `own_engine` is a replica still reporting the old shard
+        monkeypatch.setattr(db_connect, "replica_engines", [own_engine])
+        db_connect.forget_quiz_shard(QUIZ_ID)
+        with Session(own_engine) as session:
+            assert db_connect.quiz_shard(session, QUIZ_ID) is None
+    finally:
+        db.delete(db.get(db_models.Quiz, QUIZ_ID))
+        db.commit()
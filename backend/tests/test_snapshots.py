@@ -0,0 +1,23 @@
+import os
+
+import services.quiz_snapshot as quiz_snapshot
+
+
+def test_snapshot_directory_is_created_private(tmp_path, monkeypatch):
+    directory = tmp_path / "snapshots"
+    monkeypatch.setattr(quiz_snapshot, "SNAPSHOT_DIR", str(directory))
+    quiz_snapshot.write_snapshot(1, "v1", {"id": 1}, {10: {100}})
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+    assert quiz_snapshot.get_snapshot(1).is_correct(10, 100)
+
+
+def test_shared_snapshot_directories_are_refused(tmp_path, monkeypatch):
+    directory = tmp_path / "shared"
+    directory.mkdir()
+    directory.chmod(0o777)
+    monkeypatch.setattr(quiz_snapshot, "SNAPSHOT_DIR", str(directory))
+    # A key planted by another user is never read, and nothing is written there
+    quiz_snapshot.write_snapshot(1, "v1", {"id": 1}, {10: {100}})
+    assert os.listdir(directory) == []
+    assert quiz_snapshot.get_snapshot(1) is None
+    assert quiz_snapshot.snapshot_quiz_ids() == []
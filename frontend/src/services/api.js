@@ -20,10 +20,53 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Exchange the refresh token for a new access token; concurrent 401s share one request
+let refreshRequest = null;
+const refreshAccessToken = () => {
+  if (!refreshRequest) {
+    const refreshToken = localStorage.getItem('refreshToken');
+    refreshRequest = axios
+      .post(`${API_URL}/api/token/refresh`, { refresh_token: refreshToken }, { withCredentials: true })
+      .then((response) => {
+        localStorage.setItem('token', response.data.access_token);
+        localStorage.setItem('refreshToken', response.data.refresh_token);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshRequest = null;
+      });
+  }
+  return refreshRequest;
+};
+
+// 503 means the server did not process the request (busy, or the quiz is
+// briefly frozen while its attempts move shards), so it is safe to resend
+const MAX_UNAVAILABLE_RETRIES = 6;
+const retryDelayMs = (response) => {
+  const seconds = Number(response.headers?.['retry-after']);
+  return (Number.isFinite(seconds) && seconds > 0 ? Math.min(seconds, 10) : 2) * 1000;
+};
+
 // Add error handling interceptor
 api.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 503 && original && (original._unavailableRetries || 0) < MAX_UNAVAILABLE_RETRIES) {
+      original._unavailableRetries = (original._unavailableRetries || 0) + 1;
+      await new Promise((resolve) => setTimeout(resolve, retryDelayMs(error.response)));
+      return api(original);
+    }
+    if (error.response?.status === 401 && localStorage.getItem('refreshToken') && original && !original._retried) {
+      original._retried = true;
+      try {
+        const token = await refreshAccessToken();
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch (refreshError) {
+        localStorage.removeItem('refreshToken');
+      }
+    }
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
       window.location.href = '/login';
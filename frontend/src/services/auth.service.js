@@ -14,10 +14,18 @@ export const auth = {
         if (response.data.access_token) {
             localStorage.setItem('token', response.data.access_token);
         }
+        if (response.data.refresh_token) {
+            localStorage.setItem('refreshToken', response.data.refresh_token);
+        }
         return response;
     },
     logout: () => {
+        const refreshToken = localStorage.getItem('refreshToken');
+        if (refreshToken) {
+            api.post('/api/token/revoke', { refresh_token: refreshToken }).catch(() => {});
+        }
         localStorage.removeItem('token');
+        localStorage.removeItem('refreshToken');
     },
     getCurrentUser: async () => {
         const response = await api.get('/users/me');